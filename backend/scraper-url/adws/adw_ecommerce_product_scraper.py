@@ -45,6 +45,13 @@ from rich.table import Table
 from rich.rule import Rule
 from rich.progress import Progress, TaskID, BarColumn, TextColumn
 
+# Faster event loop for the concurrent scrapes, when installed (not available on Windows)
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
 # Add the parent directory to the path so we can import adw_modules as a package
 sys.path.insert(0, os.path.dirname(__file__))
 
@@ -52,6 +59,7 @@ from adw_modules.crawl4ai_wrapper import (
     Crawl4AIWrapper,
     ScrapingConfig,
     ScrapingResult,
+    close_browser_pool,
     create_simple_config,
 )
 from adw_modules.product_extractor import get_extractor
@@ -201,6 +209,22 @@ def load_urls_from_file(file_path: str) -> List[str]:
         raise click.ClickException(f"Failed to load URLs from {file_path}: {e}")
 
 
+def save_products_by_retailer(products: List[ProductData], output_dir: str):
+    """Write products to one JSON file per retailer in output_dir."""
+    from collections import defaultdict
+    products_by_retailer = defaultdict(list)
+    for p in products:
+        retailer_name = p.retailer.lower().replace(' ', '_') if p.retailer else 'unknown'
+        products_by_retailer[retailer_name].append(p.to_dict())
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    for retailer_name, retailer_products in products_by_retailer.items():
+        retailer_file = os.path.join(output_dir, f"{retailer_name}.json")
+        with open(retailer_file, 'w', encoding='utf-8') as f:
+            json.dump(retailer_products, f, ensure_ascii=False, indent=2)
+
+
 async def extract_product_data(url: str, wrapper: Crawl4AIWrapper, adw_id: str, console: Console) -> Optional[ProductData]:
     """Extract product data from a single URL."""
     try:
@@ -460,6 +484,8 @@ def main(
         retry_attempts=retry_attempts,
         retry_delay=retry_delay,
         use_browser=use_browser,
+        keep_html=True,  # Extractors parse JSON-LD/scripts from the raw HTML
+        cache_ttl=3600.0,  # One run is one snapshot: a URL listed twice is scraped once
     )
 
     # Display configuration
@@ -504,6 +530,14 @@ def main(
 
         async def run_scraping():
             """Run the product scraping process."""
+            try:
+                return await scrape_all()
+            finally:
+                # Pooled browsers outlive the wrapper; shut them down before the loop ends
+                await close_browser_pool()
+
+        async def scrape_all():
+            """Scrape every URL with the shared wrapper."""
             async with wrapper:
                 if len(urls) == 1:
                     # Single product scraping
@@ -525,13 +559,13 @@ def main(
                             async with semaphore:
                                 try:
                                     product = await extract_product_data(url, wrapper, adw_id, console)
-                                    # Add delay between requests
-                                    if delay > 0:
-                                        await asyncio.sleep(delay)
-                                    return product
                                 finally:
                                     # Update progress regardless of success/failure
                                     progress.advance(task_id)
+                            # Delay after releasing the slot so a waiting URL can start meanwhile
+                            if delay > 0:
+                                await asyncio.sleep(delay)
+                            return product
 
                         # Process all URLs concurrently
                         tasks = [scrape_with_semaphore(url) for url in urls]
@@ -543,23 +577,15 @@ def main(
                                 if result:
                                     products.append(result)
                                     
-                                    # Incremental save - separate files per retailer
+                                    # Incremental save - separate files per retailer. Serializing
+                                    # and writing run in a worker thread so the event loop keeps
+                                    # driving the other scrapes meanwhile.
                                     try:
-                                        # Group products by retailer
-                                        from collections import defaultdict
-                                        products_by_retailer = defaultdict(list)
-                                        for p in products:
-                                            retailer_name = p.retailer.lower().replace(' ', '_') if p.retailer else 'unknown'
-                                            products_by_retailer[retailer_name].append(p.to_dict())
-                                        
-                                        # Save each retailer to a separate file
-                                        output_dir = os.path.dirname(output_file_full_path)
-                                        os.makedirs(output_dir, exist_ok=True)
-                                        
-                                        for retailer_name, retailer_products in products_by_retailer.items():
-                                            retailer_file = os.path.join(output_dir, f"{retailer_name}.json")
-                                            with open(retailer_file, 'w', encoding='utf-8') as f:
-                                                json.dump(retailer_products, f, ensure_ascii=False, indent=2)
+                                        await asyncio.to_thread(
+                                            save_products_by_retailer,
+                                            list(products),
+                                            os.path.dirname(output_file_full_path),
+                                        )
                                     except Exception as e:
                                         console.print(f"[yellow]Warning: Failed to save incremental results: {e}[/yellow]")
                                         
@@ -572,7 +598,7 @@ def main(
 
         # Run the scraping
         print_status_panel(console, "Starting product scraping process", adw_id, "scraping")
-        products = asyncio.run(run_scraping())
+        products = uvloop.run(run_scraping()) if UVLOOP_AVAILABLE else asyncio.run(run_scraping())
 
         print_status_panel(console, "Completed product scraping process", adw_id, "scraping", "success")
 
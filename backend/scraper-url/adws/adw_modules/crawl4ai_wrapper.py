@@ -10,11 +10,16 @@ This module wraps the crawl4ai library to provide:
 """
 
 import asyncio
+import functools
 import json
+import os
+import re
 import time
 import urllib.parse
-from typing import List, Dict, Any, Optional, Tuple
-from dataclasses import dataclass, asdict
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable, AsyncIterator, TextIO
+from dataclasses import dataclass, asdict, field, replace
 import logging
 
 # HTTP fallback imports
@@ -30,6 +35,20 @@ try:
 except ImportError:
     BS4_AVAILABLE = False
 
+# Faster JSON output for format_results
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Multi-pattern keyword scans for detect_content_type
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
 try:
     from crawl4ai import AsyncWebCrawler
     from crawl4ai.extraction_strategy import LLMExtractionStrategy, JsonCssExtractionStrategy
@@ -99,33 +118,478 @@ class ScrapingConfig:
     include_links: bool = True
     include_images: bool = True
     include_metadata: bool = True
+    keep_html: bool = False  # Keep the raw page HTML in ScrapingResult.html
+    keep_cleaned_html: bool = True  # Use crawl4ai's cleaned HTML as ScrapingResult.content
 
+    # In-process result cache for scrape_url, off by default: a cached result can
+    # serve prices and stock up to cache_ttl old (0 disables)
+    cache_ttl: float = 0.0  # seconds
+    cache_max_entries: int = 512
 
-@dataclass
+
+@dataclass(slots=True)
 class ScrapingResult:
-    """Result of a scraping operation."""
+    """Result of a scraping operation (slotted: no per-instance __dict__)."""
     url: str
     success: bool
     content: Optional[str] = None
     markdown: Optional[str] = None
     html: Optional[str] = None
-    links: List[str] = None
-    images: List[str] = None
-    metadata: Dict[str, Any] = None
+    links: List[str] = field(default_factory=list)
+    images: List[str] = field(default_factory=list)
+    metadata: Dict[str, Any] = field(default_factory=dict)
     error_message: Optional[str] = None
-    timestamp: float = 0
+    timestamp: float = field(default_factory=time.time)
     status_code: Optional[int] = None
     extracted_content: Optional[str] = None
 
-    def __post_init__(self):
-        if self.links is None:
-            self.links = []
-        if self.images is None:
-            self.images = []
-        if self.metadata is None:
-            self.metadata = {}
-        if self.timestamp == 0:
-            self.timestamp = time.time()
+
+# Attribute _JS_SCROLL_ECOMMERCE puts on <body> when it had to click something open
+_EXPANDED_MARKER = 'data-pricehawk-expanded'
+
+# Enhanced JS code for e-commerce sites - scroll to load lazy content
+# Wrapped in async IIFE for proper execution
+_JS_SCROLL_ECOMMERCE = """
+(async () => {
+    // Function to scroll down the page to load lazy content
+    async function scrollToBottom() {
+        const scrollHeight = document.body.scrollHeight;
+        const viewportHeight = window.innerHeight;
+        let currentPosition = 0;
+
+        while (currentPosition < scrollHeight) {
+            currentPosition += viewportHeight * 0.8;
+            window.scrollTo(0, currentPosition);
+            await new Promise(resolve => setTimeout(resolve, 300));
+        }
+
+        // Scroll to middle of page where specs usually are
+        window.scrollTo(0, scrollHeight * 0.5);
+        await new Promise(resolve => setTimeout(resolve, 500));
+
+        // Scroll back to top
+        window.scrollTo(0, 0);
+        await new Promise(resolve => setTimeout(resolve, 300));
+    }
+
+    // Set when any button/tab gets clicked (reported back via a body attribute)
+    let clicked = false;
+
+    // Function to click "Read More" buttons to expand content
+    async function clickReadMoreButtons() {
+        // Thai Watsadu specific button
+        const readMoreBtn = document.getElementById('readmorePdp');
+        if (readMoreBtn) {
+            readMoreBtn.click();
+            clicked = true;
+            await new Promise(resolve => setTimeout(resolve, 800));
+        }
+
+        // HomePro specific - click specification tab to load dimensions/volume
+        const homeproSpecTab = document.getElementById('product-specification-tab');
+        if (homeproSpecTab) {
+            homeproSpecTab.click();
+            clicked = true;
+            await new Promise(resolve => setTimeout(resolve, 800));
+        }
+
+        // DoHome specific - click "ข้อมูลจำเพาะ" (Specifications) tab
+        const dohomeButtons = document.querySelectorAll('button');
+        for (const btn of dohomeButtons) {
+            const h2 = btn.querySelector('h2');
+            if (h2 && h2.textContent.includes('ข้อมูลจำเพาะ')) {
+                btn.click();
+                clicked = true;
+                await new Promise(resolve => setTimeout(resolve, 800));
+                break;
+            }
+        }
+
+        // Boonthavorn specific - click "ข้อมูลจำเพาะ" (Specifications) tab
+        // The tab is an h5 element with class horizontalTab-tabListItem
+        const boonthavornTabs = document.querySelectorAll('h5[class*="horizontalTab-tabListItem"], [class*="horizontalTab"] span, [class*="horizontalTabs"] h5');
+        for (const tab of boonthavornTabs) {
+            if (tab.textContent && tab.textContent.includes('ข้อมูลจำเพาะ')) {
+                // Scroll to the tab first
+                tab.scrollIntoView({ behavior: 'instant', block: 'center' });
+                await new Promise(resolve => setTimeout(resolve, 500));
+                // Try multiple click methods for React components
+                tab.click();
+                tab.dispatchEvent(new MouseEvent('click', { bubbles: true, cancelable: true, view: window }));
+                clicked = true;
+                await new Promise(resolve => setTimeout(resolve, 1500));
+                break;
+            }
+        }
+
+        // Generic read more buttons
+        const selectors = [
+            'button[class*="read-more"]',
+            'button[class*="show-more"]',
+            '.read-more',
+            '.show-more',
+            '[data-action="expand"]'
+        ];
+
+        for (const selector of selectors) {
+            try {
+                const buttons = document.querySelectorAll(selector);
+                for (const btn of buttons) {
+                    if (btn && btn.offsetParent !== null) {
+                        btn.click();
+                        clicked = true;
+                        await new Promise(resolve => setTimeout(resolve, 300));
+                    }
+                }
+            } catch (e) {}
+        }
+    }
+
+    // Wait for initial page load
+    await new Promise(resolve => setTimeout(resolve, 1500));
+
+    // Scroll the page to load lazy content
+    await scrollToBottom();
+
+    // Click any "Read More" buttons to expand hidden content
+    await clickReadMoreButtons();
+
+    // Scroll again after clicking
+    await scrollToBottom();
+
+    // Final wait for content to render
+    await new Promise(resolve => setTimeout(resolve, 1000));
+
+    if (clicked) {
+        document.body.setAttribute('{marker}', '1');
+    }
+})();
+""".replace('{marker}', _EXPANDED_MARKER)
+
+# Other sites: just give the page time to settle
+_JS_SCROLL_GENERIC = """
+(async () => {
+    await new Promise(resolve => setTimeout(resolve, 1500));
+})();
+"""
+
+# crawl4ai result attributes that not every version/mode provides
+_CRAWL_RESULT_OPTIONAL_FIELDS = ('status_code', 'extracted_content', 'title', 'description', 'language')
+
+# Cap on distinct prebuilt run configs (one per scroll script / strategy / selector combo)
+_MAX_RUN_CONFIGS = 32
+
+# Default wait condition in browser mode: page loaded with some visible text
+_DEFAULT_WAIT_FOR = "() => document.readyState === 'complete' && document.body && document.body.innerText.length > 100"
+
+
+# Error messages that mean the browser/page went away (see _is_browser_closed_error)
+_BROWSER_CLOSED_RE = re.compile(
+    r"Target page, context or browser has been closed"
+    r"|BrowserType\.launch"
+    r"|Browser closed"
+    r"|Connection closed"
+    r"|Browser has been closed"
+    r"|page\.goto: Target closed"
+)
+
+# Whitespace-separated tokens, as str.split() sees them
+_WORD_RE = re.compile(r"\S+")
+
+
+def _count_words(text: Optional[str]) -> int:
+    """Word count of text without building the token list that len(text.split()) would."""
+    return _WORD_RE.subn("", text)[1] if text else 0
+
+
+_NON_SPACE_RE = re.compile(r"\S")
+
+
+def _stripped_longer_than(text: Optional[str], length: int) -> bool:
+    """len(text.strip()) > length, without copying the text to strip it."""
+    if not text or len(text) <= length:
+        return False
+    first = _NON_SPACE_RE.search(text)
+    if not first:
+        return False
+    end = len(text)
+    while text[end - 1].isspace():
+        end -= 1
+    return end - first.start() > length
+
+
+# Domains of the supported e-commerce retailers (see is_ecommerce_url)
+_SUPPORTED_RETAILERS = frozenset({
+    'thaiwatsadu.com',
+    'homepro.co.th',
+    'dohome.co.th',
+    'boonthavorn.com',
+    'globalhouse.co.th',
+    'megahome.co.th',
+})
+
+
+# scheme://[userinfo@][www.]host -- the host (an IPv6 literal keeps its brackets)
+_DOMAIN_RE = re.compile(r'[a-z][a-z0-9+.\-]*://(?:[^/?#@]*@)?(?:www\.)?(\[[^\]/]*\]|[^/:?#]+)', re.I)
+
+
+@functools.lru_cache(maxsize=4096)
+def _extract_domain(url: str) -> str:
+    """Lowercased host of a URL without a leading 'www.' ('' if it has no scheme://host)."""
+    match = _DOMAIN_RE.match(url)
+    return match.group(1).lower() if match else ''
+
+
+class _KeywordClassifier:
+    """Map text to the first category (in priority order) with a keyword found in it.
+
+    All keywords are found in a single scan of the text: with pyahocorasick's
+    automaton when installed, otherwise with one compiled regex alternation.
+    """
+
+    def __init__(self, categories: Tuple[Tuple[str, Tuple[str, ...]], ...]):
+        self._labels = tuple(category for category, _ in categories)
+        self._automaton = None
+        self._regex = None
+        if AHOCORASICK_AVAILABLE:
+            automaton = ahocorasick.Automaton()
+            for rank, (_, keywords) in enumerate(categories):
+                for keyword in keywords:
+                    # A keyword listed under several categories keeps the best rank
+                    if keyword not in automaton:
+                        automaton.add_word(keyword, rank)
+            automaton.make_automaton()
+            self._automaton = automaton
+        else:
+            # One named group per category, tried in rank order at each position;
+            # the lookahead lets overlapping keywords all be seen
+            self._regex = re.compile('(?=' + '|'.join(
+                f"(?P<c{rank}>{'|'.join(map(re.escape, keywords))})"
+                for rank, (_, keywords) in enumerate(categories)
+            ) + ')')
+
+    def _ranks(self, text: str):
+        if self._automaton is not None:
+            return (rank for _, rank in self._automaton.iter(text))
+        return (int(match.lastgroup[1:]) for match in self._regex.finditer(text))
+
+    def classify(self, text: str) -> Optional[str]:
+        best = None
+        for rank in self._ranks(text):
+            if best is None or rank < best:
+                best = rank
+                if rank == 0:
+                    break
+        return None if best is None else self._labels[best]
+
+
+# detect_content_type keyword tables, checked against the lowercased URL,
+# title + description, and page content respectively
+_URL_TYPES = _KeywordClassifier((
+    ('products', ('/product', '/item', '/shop', '/buy', '/cart')),
+    ('articles', ('/article', '/blog', '/news', '/post', '/story')),
+    ('documentation', ('/doc', '/documentation', '/guide', '/help', '/wiki')),
+    ('api', ('/api', '/endpoint', '/service')),
+    ('forum', ('/forum', '/discussion', '/thread', '/comment')),
+    ('video', ('/video', '/watch', '/play', '/stream')),
+))
+_METADATA_TYPES = _KeywordClassifier((
+    ('products', ('product', 'buy', 'price', 'shop', 'cart', 'purchase')),
+    ('articles', ('article', 'blog', 'news', 'post', 'story', 'published')),
+    ('documentation', ('documentation', 'guide', 'help', 'manual', 'tutorial')),
+))
+_CONTENT_TYPES = _KeywordClassifier((
+    ('products', ('price', 'cart', 'checkout', 'buy now', 'add to cart')),
+    ('articles', ('article', 'published', 'author', 'posted on')),
+    ('documentation', ('documentation', 'guide', 'tutorial', 'step by step')),
+))
+
+
+@functools.lru_cache(maxsize=4096)
+def _classify_url(url: str) -> Optional[str]:
+    """Content type implied by the URL's path patterns alone (see detect_content_type)."""
+    return _URL_TYPES.classify(url.lower())
+
+
+# Domain substrings for detect_content_type's last-resort guess
+_PRODUCT_DOMAIN_TOKENS = ('amazon', 'ebay', 'shopify', 'woocommerce')
+_DOC_DOMAIN_TOKENS = ('wikipedia', 'wiki', 'docs')
+
+
+# Skip the browser liveness check for this long after a successful crawl (seconds)
+_ALIVE_CHECK_INTERVAL = 60.0
+
+# Pooled crawlers are retired (closed and replaced) after this many arun calls
+CRAWL4AI_BROWSER_MAX_USAGE = int(os.getenv("CRAWL4AI_BROWSER_MAX_USAGE", "100"))
+
+
+@dataclass
+class _PoolEntry:
+    """Bookkeeping for one crawler owned by BrowserPool."""
+    crawler: Any
+    key: Tuple
+    holders: int = 0  # wrappers currently holding the crawler
+    active: int = 0  # arun calls in flight
+    usage: int = 0  # arun calls made so far
+    retired: bool = False
+
+
+class BrowserPool:
+    """Warm AsyncWebCrawler instances shared by all Crawl4AIWrapper instances.
+
+    Crawlers are keyed by their launch settings. A released crawler stays started
+    (hot) for the next acquire with the same key instead of being closed, so browser
+    launch cost is paid once per process rather than once per wrapper. A crawler is
+    retired after max_usage arun calls, or when discarded after a browser failure,
+    and is only closed once no wrapper holds it and no request is running on it.
+    """
+
+    def __init__(self, max_usage: int = CRAWL4AI_BROWSER_MAX_USAGE):
+        self.max_usage = max_usage
+        self._entries: Dict[int, _PoolEntry] = {}  # id(crawler) -> entry
+        self._idle: Dict[Tuple, List[Any]] = {}
+        self._loop = None
+
+    async def _check_loop(self):
+        """Shut down crawlers started on a previous event loop; they can't be reused there."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            self._idle.clear()
+            self._loop = loop
+            if entries:
+                logger.debug(f"Event loop changed, closing {len(entries)} orphaned crawler(s)")
+            for entry in entries:
+                await _close_orphaned_crawler(entry.crawler)
+
+    async def acquire(self, key: Tuple, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Return an idle crawler for key, or start a new one with `await factory()`."""
+        await self._check_loop()
+        idle = self._idle.get(key)
+        if idle:
+            crawler = idle.pop()
+            logger.debug("Reusing warm crawler from pool")
+        else:
+            crawler = await factory()
+            self._entries[id(crawler)] = _PoolEntry(crawler=crawler, key=key)
+        self._entries[id(crawler)].holders += 1
+        return crawler
+
+    async def release(self, crawler: Any):
+        """Hand a crawler back: keep it warm, or close it if it is retired and unused."""
+        entry = self._entries.get(id(crawler))
+        if entry is None:
+            await _close_crawler(crawler)
+            return
+        entry.holders -= 1
+        if entry.usage >= self.max_usage:
+            entry.retired = True
+        if entry.retired:
+            await self._close_if_unused(entry)
+        elif entry.holders == 0:
+            self._idle.setdefault(entry.key, []).append(crawler)
+
+    async def discard(self, crawler: Any):
+        """Hand back a crawler whose browser failed; it is never reused."""
+        entry = self._entries.get(id(crawler))
+        if entry is None:
+            await _close_crawler(crawler)
+            return
+        entry.holders -= 1
+        entry.retired = True
+        await self._close_if_unused(entry)
+
+    def is_retired(self, crawler: Any) -> bool:
+        """Whether the holder should swap this crawler for a fresh one."""
+        entry = self._entries.get(id(crawler))
+        return entry is not None and entry.retired
+
+    @asynccontextmanager
+    async def track(self, crawler: Any):
+        """Count one arun on crawler: in flight for the block, then towards max_usage."""
+        entry = self._entries.get(id(crawler))
+        if entry is None:
+            yield
+            return
+        entry.active += 1
+        entry.usage += 1
+        try:
+            yield
+        finally:
+            entry.active -= 1
+            if entry.usage >= self.max_usage:
+                entry.retired = True
+            await self._close_if_unused(entry)
+
+    async def _close_if_unused(self, entry: _PoolEntry):
+        if entry.retired and entry.active == 0 and entry.holders <= 0:
+            if self._entries.pop(id(entry.crawler), None) is not None:
+                logger.debug(f"Retiring pooled crawler after {entry.usage} request(s)")
+                await _close_crawler(entry.crawler)
+
+    async def close_all(self):
+        """Close every crawler owned by the pool."""
+        entries = list(self._entries.values())
+        self._entries.clear()
+        self._idle.clear()
+        for entry in entries:
+            await _close_crawler(entry.crawler)
+
+
+async def _start_crawler(crawler: Any) -> Any:
+    """Start a new crawler, closing it again if the launch fails."""
+    try:
+        await crawler.start()
+    except Exception:
+        await _close_crawler(crawler)
+        raise
+    return crawler
+
+
+async def _close_crawler(crawler: Any):
+    try:
+        await crawler.close()
+        logger.debug("Browser cleanup successful")
+    except Exception as e:
+        # Ignore errors during cleanup - browser may already be closed
+        logger.debug(f"Browser cleanup note (may be already closed): {e}")
+
+
+# How long to wait for a crawler from a previous event loop to close before killing it
+_ORPHAN_CLOSE_TIMEOUT = 10.0
+
+
+async def _close_orphaned_crawler(crawler: Any):
+    """Close a crawler left over from a finished event loop, killing its browser if that hangs.
+
+    Its browser connection belongs to the old loop, so close() can stall instead of
+    failing; the browser process is then killed directly so it doesn't outlive us.
+    """
+    try:
+        await asyncio.wait_for(_close_crawler(crawler), _ORPHAN_CLOSE_TIMEOUT)
+        return
+    except asyncio.TimeoutError:
+        pass
+    strategy = getattr(crawler, 'crawler_strategy', None)
+    manager = getattr(strategy, 'browser_manager', None)
+    process = getattr(getattr(manager, 'managed_browser', None), 'browser_process', None)
+    if process is not None:
+        try:
+            process.kill()
+            logger.debug("Killed browser process of orphaned crawler")
+        except Exception as e:
+            logger.debug(f"Could not kill orphaned browser process: {e}")
+    else:
+        logger.warning("Orphaned crawler did not close in time and has no browser process to kill")
+
+
+_BROWSER_POOL = BrowserPool()
+
+
+async def close_browser_pool():
+    """Close all pooled browsers. Call once before the event loop shuts down."""
+    await _BROWSER_POOL.close_all()
 
 
 class Crawl4AIWrapper:
@@ -149,6 +613,16 @@ class Crawl4AIWrapper:
         self._current_mode = None  # Track current mode: 'browser', 'text', or 'http'
         self._browser_reinit_attempts = 0  # Track reinitialization attempts during scraping
         self._use_http_fallback = False  # Use pure HTTP when browser unavailable
+        self._init_lock = asyncio.Lock()  # Serializes (re)initialization across concurrent scrapes
+        self._last_successful_scrape = 0.0  # time.time() of the last successful crawl
+        # LRU cache of successful scrapes: key -> (stored_at, extraction_strategy, result)
+        self._cache: "OrderedDict[Tuple, Tuple[float, Any, ScrapingResult]]" = OrderedDict()
+        # Pass a CrawlerRunConfig to arun (v0.7.x+ in browser mode) rather than kwargs
+        self._use_run_config = CrawlerRunConfig is not None and self.config.use_browser
+        # Prebuilt CrawlerRunConfigs, see _get_run_config
+        self._run_configs: Dict[Tuple, Tuple[Any, Any]] = {}
+        # Per-domain scroll profile: domain -> {'avg_content': int, 'samples': int, 'needed_scroll': bool}
+        self._domain_profile: Dict[str, Dict[str, Any]] = {}
 
     async def __aenter__(self):
         """Async context manager entry."""
@@ -159,15 +633,18 @@ class Crawl4AIWrapper:
         """Async context manager exit."""
         await self.close()
 
-    async def _cleanup_browser(self):
-        """Private method for consistent browser cleanup across the class."""
+    async def _cleanup_browser(self, discard: bool = False):
+        """Private method for consistent browser cleanup across the class.
+
+        The crawler goes back to the shared pool; with discard=True (browser failed)
+        it is retired instead of being kept warm.
+        """
         if self.crawler:
             try:
-                await self.crawler.close()
-                logger.debug("Browser cleanup successful")
-            except Exception as e:
-                # Ignore errors during cleanup - browser may already be closed
-                logger.debug(f"Browser cleanup note (may be already closed): {e}")
+                if discard:
+                    await _BROWSER_POOL.discard(self.crawler)
+                else:
+                    await _BROWSER_POOL.release(self.crawler)
             finally:
                 self.crawler = None
                 self._current_mode = None
@@ -197,9 +674,16 @@ class Crawl4AIWrapper:
     async def initialize(self, force_text_mode: bool = False):
         """Initialize the crawler instance with retry logic.
 
+        Crawlers are drawn from the shared BrowserPool, so only the first wrapper
+        with given launch settings pays the browser start-up cost.
+
         Args:
             force_text_mode: If True, skip browser mode and use text mode directly.
         """
+        async with self._init_lock:
+            await self._initialize(force_text_mode)
+
+    async def _initialize(self, force_text_mode: bool = False):
         # If use_browser is False, use pure HTTP fallback (no crawl4ai at all)
         if not self.config.use_browser:
             if HTTPX_AVAILABLE:
@@ -223,35 +707,17 @@ class Crawl4AIWrapper:
                     # Ensure clean state before retry
                     await self._cleanup_browser()
 
-                    # crawl4ai v0.7.x uses extra_args for browser arguments
-                    browser_cfg = BrowserConfig(
-                        headless=True,
-                        verbose=self.config.verbose,
-                        extra_args=[
-                            "--no-sandbox",
-                            "--disable-setuid-sandbox",
-                            "--disable-dev-shm-usage",
-                            "--disable-gpu",
-                        ]
+                    self.crawler = await _BROWSER_POOL.acquire(
+                        self._pool_key('browser'), self._start_browser_crawler
                     )
-                    self.crawler = AsyncWebCrawler(config=browser_cfg)
-                    await self.crawler.start()
                     self._current_mode = 'browser'
                     logger.info(f"Crawl4AI crawler initialized with browser (attempt {attempt + 1})")
                     return
                 except Exception as browser_err:
                     last_error = browser_err
-                    error_str = str(browser_err)
 
                     # Check for specific browser closure errors
-                    is_browser_closed_error = (
-                        "Target page, context or browser has been closed" in error_str or
-                        "BrowserType.launch" in error_str or
-                        "Browser closed" in error_str or
-                        "Connection closed" in error_str
-                    )
-
-                    if is_browser_closed_error:
+                    if self._is_browser_closed_error(browser_err):
                         logger.warning(
                             f"Browser launch failed (attempt {attempt + 1}/{self.config.browser_launch_retries}): {browser_err}"
                         )
@@ -274,21 +740,9 @@ class Crawl4AIWrapper:
         try:
             await self._cleanup_browser()
 
-            if BrowserConfig is not None:
-                browser_cfg = BrowserConfig(
-                    headless=True,
-                    text_mode=True,  # Use HTTP-only mode without browser
-                    verbose=self.config.verbose,
-                )
-                self.crawler = AsyncWebCrawler(config=browser_cfg)
-            else:
-                # Fallback for older versions
-                self.crawler = AsyncWebCrawler(
-                    headless=self.config.headless,
-                    verbose=self.config.verbose,
-                )
-
-            await self.crawler.start()
+            self.crawler = await _BROWSER_POOL.acquire(
+                self._pool_key('text'), self._start_text_crawler
+            )
             self._current_mode = 'text'
             logger.info("Crawl4AI crawler initialized in text mode (no browser)")
         except Exception as e:
@@ -299,8 +753,44 @@ class Crawl4AIWrapper:
                 raise last_error
             raise
 
+    async def _start_browser_crawler(self) -> Any:
+        """Launch a new browser-mode crawler (BrowserPool factory)."""
+        # crawl4ai v0.7.x uses extra_args for browser arguments
+        browser_cfg = BrowserConfig(
+            headless=True,
+            verbose=self.config.verbose,
+            extra_args=[
+                "--no-sandbox",
+                "--disable-setuid-sandbox",
+                "--disable-dev-shm-usage",
+                "--disable-gpu",
+            ]
+        )
+        return await _start_crawler(AsyncWebCrawler(config=browser_cfg))
+
+    async def _start_text_crawler(self) -> Any:
+        """Launch a new text-mode (no browser) crawler (BrowserPool factory)."""
+        if BrowserConfig is not None:
+            browser_cfg = BrowserConfig(
+                headless=True,
+                text_mode=True,  # Use HTTP-only mode without browser
+                verbose=self.config.verbose,
+            )
+            crawler = AsyncWebCrawler(config=browser_cfg)
+        else:
+            # Fallback for older versions
+            crawler = AsyncWebCrawler(
+                headless=self.config.headless,
+                verbose=self.config.verbose,
+            )
+        return await _start_crawler(crawler)
+
+    def _pool_key(self, mode: str) -> Tuple:
+        """BrowserPool key: crawlers are only shared between identical launch settings."""
+        return (mode, self.config.headless, self.config.user_agent, self.config.verbose)
+
     async def close(self):
-        """Close the crawler instance safely."""
+        """Return the crawler to the shared pool (see close_browser_pool to shut browsers down)."""
         await self._cleanup_browser()
         logger.info("Crawl4AI crawler closed successfully")
 
@@ -342,25 +832,7 @@ class Crawl4AIWrapper:
             True if the URL belongs to a supported e-commerce retailer, False otherwise
         """
         try:
-            # Extract domain from URL
-            parsed = urllib.parse.urlparse(url.lower())
-            domain = parsed.netloc.lower()
-
-            # Remove www. prefix if present
-            if domain.startswith('www.'):
-                domain = domain[4:]
-
-            # List of supported e-commerce retailers
-            supported_retailers = {
-                'thaiwatsadu.com',
-                'homepro.co.th',
-                'dohome.co.th',
-                'boonthavorn.com',
-                'globalhouse.co.th',
-                'megahome.co.th'
-            }
-
-            return domain in supported_retailers
+            return _extract_domain(url) in _SUPPORTED_RETAILERS
         except Exception as e:
             logger.warning(f"Failed to check e-commerce URL {url}: {e}")
             return False
@@ -374,15 +846,7 @@ class Crawl4AIWrapper:
         Returns:
             True if this appears to be a browser closure error.
         """
-        error_str = str(error)
-        return (
-            "Target page, context or browser has been closed" in error_str or
-            "BrowserType.launch" in error_str or
-            "Browser closed" in error_str or
-            "Connection closed" in error_str or
-            "Browser has been closed" in error_str or
-            "page.goto: Target closed" in error_str
-        )
+        return _BROWSER_CLOSED_RE.search(str(error)) is not None
 
     async def _scrape_url_http(self, url: str) -> ScrapingResult:
         """Scrape a URL using pure HTTP (no browser).
@@ -410,7 +874,7 @@ class Crawl4AIWrapper:
                 response.raise_for_status()
 
                 html_content = response.text
-                result.html = html_content
+                result.html = html_content if self.config.keep_html else None
                 result.status_code = response.status_code
                 result.success = True
 
@@ -453,7 +917,7 @@ class Crawl4AIWrapper:
                         'title': title,
                         'status_code': response.status_code,
                         'url': url,
-                        'word_count': len(result.content.split()) if result.content else 0,
+                        'word_count': _count_words(result.content),
                         'extraction_method': 'http_fallback',
                     }
                 else:
@@ -502,17 +966,72 @@ class Crawl4AIWrapper:
             return ScrapingResult(
                 url=url,
                 success=False,
-                error_message=normalized_url_or_error
+                error_message=normalized_url_or_error,
+                metadata={'is_ecommerce': False}
             )
 
         url = normalized_url_or_error
+        is_ecommerce = self.is_ecommerce_url(url)
+
+        key = (url, id(extraction_strategy), wait_for, css_selector)
+        cached = self._cache_get(key, extraction_strategy)
+        if cached is not None:
+            logger.info(f"Cache hit for {url}")
+            return cached
+
+        result = await self._fetch_url(url, extraction_strategy, wait_for, css_selector, is_ecommerce)
+        # Recorded on every result so format_results doesn't have to re-parse the URL
+        result.metadata['is_ecommerce'] = is_ecommerce
+        if result.success:
+            self._cache_put(key, extraction_strategy, result)
+        return result
 
+    def _cache_get(self, key: Tuple, extraction_strategy: Optional[Any]) -> Optional[ScrapingResult]:
+        """Return a fresh copy of a cached result, or None if missing/expired."""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        stored_at, strategy, result = entry
+        # The strategy is keyed by id(); holding it in the entry keeps that id from being
+        # reused, and the identity check makes a hit mean the very same object
+        if strategy is not extraction_strategy or time.time() - stored_at >= self.config.cache_ttl:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        # Copy the mutable fields so callers can't alter the cached entry
+        return replace(result, links=list(result.links), images=list(result.images),
+                       metadata=dict(result.metadata), timestamp=time.time())
+
+    def _cache_put(self, key: Tuple, extraction_strategy: Optional[Any], result: ScrapingResult):
+        if self.config.cache_ttl <= 0 or self.config.cache_max_entries <= 0:
+            return
+        self._cache[key] = (time.time(), extraction_strategy, result)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.config.cache_max_entries:
+            self._cache.popitem(last=False)
+
+    def clear_cache(self):
+        """Drop all cached scrape results."""
+        self._cache.clear()
+
+    async def _fetch_url(
+        self,
+        url: str,
+        extraction_strategy: Optional[Any],
+        wait_for: Optional[str],
+        css_selector: Optional[str],
+        is_ecommerce: bool
+    ) -> ScrapingResult:
+        """Scrape an already-validated URL, bypassing the cache."""
         # Use HTTP fallback if configured
         if self._use_http_fallback:
             return await self._scrape_url_http(url)
 
-        # Check if browser is alive, reinitialize if needed
-        if not self._is_browser_alive():
+        # Only initialize up front when there is no usable crawler. A browser that died
+        # mid-session is detected from the arun error (see the except path below), so
+        # the liveness check is skipped while crawls have been succeeding recently.
+        recently_ok = time.time() - self._last_successful_scrape < _ALIVE_CHECK_INTERVAL
+        if self.crawler is None or (not recently_ok and not self._is_browser_alive()):
             logger.debug("Browser not alive, reinitializing...")
             await self.initialize()
             # After reinitialize, check if we switched to HTTP fallback
@@ -520,7 +1039,31 @@ class Crawl4AIWrapper:
                 return await self._scrape_url_http(url)
 
         result = ScrapingResult(url=url, success=False)
+        domain = self.get_domain_from_url(url)
         max_browser_reinit = 2  # Maximum number of browser reinitialization attempts per URL
+        crawler = self.crawler
+
+        # E-commerce URLs need the longer scroll-and-click script, unless earlier
+        # pages of the same domain came back complete without it
+        use_full_scroll = is_ecommerce and self._needs_scroll(domain)
+
+        # Build the arun arguments once for all attempts: a CrawlerRunConfig if
+        # available (v0.7.x+), else plain kwargs for older versions or non-browser mode
+        if self._use_run_config:
+            run_args = {'config': self._get_run_config(use_full_scroll, extraction_strategy,
+                                                       wait_for, css_selector)}
+        else:
+            run_args = {
+                'word_count_threshold': self.config.min_content_length,
+                'extraction_strategy': extraction_strategy,
+                'bypass_cache': False,
+                'js_code': (_JS_SCROLL_ECOMMERCE if use_full_scroll else _JS_SCROLL_GENERIC)
+                if self.config.use_browser else None,
+                'wait_for': wait_for or (_DEFAULT_WAIT_FOR if self.config.use_browser else None),
+                'css_selector': css_selector or ("body" if self.config.use_browser else None),
+                'simulate_user': self.config.simulate_user,
+                'override_navigator': True,
+            }
 
         for attempt in range(self.config.retry_attempts):
             try:
@@ -530,189 +1073,66 @@ class Crawl4AIWrapper:
 
                 logger.info(f"Scraping URL: {url} (attempt {attempt + 1})")
 
-                # Determine if this is an e-commerce URL that needs scrolling
-                is_ecommerce = self.is_ecommerce_url(url)
-
-                # Enhanced JS code for e-commerce sites - scroll to load lazy content
-                # Wrapped in async IIFE for proper execution
-                js_scroll_code = """
-(async () => {
-    // Function to scroll down the page to load lazy content
-    async function scrollToBottom() {
-        const scrollHeight = document.body.scrollHeight;
-        const viewportHeight = window.innerHeight;
-        let currentPosition = 0;
-
-        while (currentPosition < scrollHeight) {
-            currentPosition += viewportHeight * 0.8;
-            window.scrollTo(0, currentPosition);
-            await new Promise(resolve => setTimeout(resolve, 300));
-        }
-
-        // Scroll to middle of page where specs usually are
-        window.scrollTo(0, scrollHeight * 0.5);
-        await new Promise(resolve => setTimeout(resolve, 500));
-
-        // Scroll back to top
-        window.scrollTo(0, 0);
-        await new Promise(resolve => setTimeout(resolve, 300));
-    }
-
-    // Function to click "Read More" buttons to expand content
-    async function clickReadMoreButtons() {
-        // Thai Watsadu specific button
-        const readMoreBtn = document.getElementById('readmorePdp');
-        if (readMoreBtn) {
-            readMoreBtn.click();
-            await new Promise(resolve => setTimeout(resolve, 800));
-        }
-
-        // HomePro specific - click specification tab to load dimensions/volume
-        const homeproSpecTab = document.getElementById('product-specification-tab');
-        if (homeproSpecTab) {
-            homeproSpecTab.click();
-            await new Promise(resolve => setTimeout(resolve, 800));
-        }
-
-        // DoHome specific - click "ข้อมูลจำเพาะ" (Specifications) tab
-        const dohomeButtons = document.querySelectorAll('button');
-        for (const btn of dohomeButtons) {
-            const h2 = btn.querySelector('h2');
-            if (h2 && h2.textContent.includes('ข้อมูลจำเพาะ')) {
-                btn.click();
-                await new Promise(resolve => setTimeout(resolve, 800));
-                break;
-            }
-        }
-
-        // Boonthavorn specific - click "ข้อมูลจำเพาะ" (Specifications) tab
-        // The tab is an h5 element with class horizontalTab-tabListItem
-        const boonthavornTabs = document.querySelectorAll('h5[class*="horizontalTab-tabListItem"], [class*="horizontalTab"] span, [class*="horizontalTabs"] h5');
-        for (const tab of boonthavornTabs) {
-            if (tab.textContent && tab.textContent.includes('ข้อมูลจำเพาะ')) {
-                // Scroll to the tab first
-                tab.scrollIntoView({ behavior: 'instant', block: 'center' });
-                await new Promise(resolve => setTimeout(resolve, 500));
-                // Try multiple click methods for React components
-                tab.click();
-                tab.dispatchEvent(new MouseEvent('click', { bubbles: true, cancelable: true, view: window }));
-                await new Promise(resolve => setTimeout(resolve, 1500));
-                break;
-            }
-        }
-
-        // Generic read more buttons
-        const selectors = [
-            'button[class*="read-more"]',
-            'button[class*="show-more"]',
-            '.read-more',
-            '.show-more',
-            '[data-action="expand"]'
-        ];
-
-        for (const selector of selectors) {
-            try {
-                const buttons = document.querySelectorAll(selector);
-                for (const btn of buttons) {
-                    if (btn && btn.offsetParent !== null) {
-                        btn.click();
-                        await new Promise(resolve => setTimeout(resolve, 300));
-                    }
-                }
-            } catch (e) {}
-        }
-    }
-
-    // Wait for initial page load
-    await new Promise(resolve => setTimeout(resolve, 1500));
-
-    // Scroll the page to load lazy content
-    await scrollToBottom();
-
-    // Click any "Read More" buttons to expand hidden content
-    await clickReadMoreButtons();
-
-    // Scroll again after clicking
-    await scrollToBottom();
+                # Swap in a fresh crawler once the pool has retired this one (max usage)
+                if _BROWSER_POOL.is_retired(self.crawler):
+                    await self.initialize()
+                # Keep a local reference: a concurrent reinit may swap self.crawler mid-request
+                crawler = self.crawler
 
-    // Final wait for content to render
-    await new Promise(resolve => setTimeout(resolve, 1000));
-})();
-                """ if is_ecommerce else """
-(async () => {
-    await new Promise(resolve => setTimeout(resolve, 1500));
-})();
-                """
-
-                # Perform the crawl using CrawlerRunConfig if available (v0.7.x+)
-                if CrawlerRunConfig is not None and self.config.use_browser:
-                    run_config = CrawlerRunConfig(
-                        word_count_threshold=self.config.min_content_length,
-                        extraction_strategy=extraction_strategy,
-                        bypass_cache=False,
-                        js_code=js_scroll_code,
-                        wait_for=wait_for or "() => document.readyState === 'complete' && document.body && document.body.innerText.length > 100",
-                        css_selector=css_selector or "body",
-                        simulate_user=self.config.simulate_user,
-                        override_navigator=True,
-                    )
-                    crawl_result = await self.crawler.arun(url=url, config=run_config)
-                else:
-                    # Fallback for older versions or non-browser mode
-                    crawl_result = await self.crawler.arun(
-                        url=url,
-                        word_count_threshold=self.config.min_content_length,
-                        extraction_strategy=extraction_strategy,
-                        bypass_cache=False,
-                        js_code=js_scroll_code if self.config.use_browser else None,
-                        wait_for=wait_for or ("""
-                        () => document.readyState === 'complete' &&
-                        document.body && document.body.innerText.length > 100
-                        """ if self.config.use_browser else None),
-                        css_selector=css_selector or ("""
-                        body
-                        """ if self.config.use_browser else None),
-                        simulate_user=self.config.simulate_user,
-                        override_navigator=True,
-                    )
+                async with _BROWSER_POOL.track(crawler):
+                    crawl_result = await crawler.arun(url=url, **run_args)
 
                 if crawl_result.success:
+                    # Read the optional fields from one attribute snapshot instead of a getattr each
+                    cr = getattr(crawl_result, '__dict__', None)
+                    if not cr:  # __slots__ result class
+                        cr = {name: getattr(crawl_result, name) for name in _CRAWL_RESULT_OPTIONAL_FIELDS
+                              if hasattr(crawl_result, name)}
+                    self._last_successful_scrape = time.time()
                     result.success = True
-                    result.content = crawl_result.cleaned_html or crawl_result.html
+                    # content falls back to the raw HTML when there is no cleaned HTML;
+                    # a second copy of the raw HTML is only kept in html on request
+                    cleaned_html = crawl_result.cleaned_html if self.config.keep_cleaned_html else None
+                    result.content = cleaned_html or crawl_result.html
                     result.markdown = str(crawl_result.markdown) if crawl_result.markdown else None
-                    result.html = crawl_result.html
-                    result.status_code = getattr(crawl_result, 'status_code', 200)
-                    result.extracted_content = getattr(crawl_result, 'extracted_content', None)
+                    result.html = crawl_result.html if self.config.keep_html else None
+                    result.status_code = cr.get('status_code', 200)
+                    result.extracted_content = cr.get('extracted_content')
+
+                    if is_ecommerce and self.config.use_browser and self._current_mode == 'browser':
+                        self._update_domain_profile(
+                            domain, len(result.content or ''),
+                            _EXPANDED_MARKER in (crawl_result.html or ''))
 
                     # Extract links
                     if self.config.include_links and crawl_result.links:
                         try:
-                            result.links = [link.get('href', '') for link in crawl_result.links
-                                          if link and hasattr(link, 'get') and link.get('href')]
+                            # crawl4ai hands back plain dicts; isinstance is far cheaper than hasattr
+                            result.links = [href for href in (link.get('href') for link in crawl_result.links
+                                                              if isinstance(link, dict)) if href]
                         except (TypeError, AttributeError):
                             result.links = []
 
                     # Extract images
                     if self.config.include_images and crawl_result.media:
                         try:
-                            result.images = [media.get('src', '') for media in crawl_result.media
-                                          if media and hasattr(media, 'get') and media.get('src') and media.get('type') == 'image']
+                            result.images = [src for src in (media.get('src') for media in crawl_result.media
+                                                             if isinstance(media, dict) and media.get('type') == 'image') if src]
                         except (TypeError, AttributeError):
                             result.images = []
 
                     # Extract metadata
                     if self.config.include_metadata:
                         # Enhanced metadata for new structured output
-                        domain = self.get_domain_from_url(url)
                         content_type = self.detect_content_type(url, result.content, result.metadata)
 
                         result.metadata = {
-                            'title': getattr(crawl_result, 'title', ''),
-                            'description': getattr(crawl_result, 'description', ''),
-                            'language': getattr(crawl_result, 'language', ''),
+                            'title': cr.get('title', ''),
+                            'description': cr.get('description', ''),
+                            'language': cr.get('language', ''),
                             'status_code': result.status_code,
                             'url': url,
-                            'word_count': len(result.content.split()) if result.content else 0,
+                            'word_count': _count_words(result.content),
                             # New fields for structured output
                             'domain': domain,
                             'content_type': content_type,
@@ -742,7 +1162,10 @@ class Crawl4AIWrapper:
                             f"(reinit attempt {self._browser_reinit_attempts}/{max_browser_reinit})..."
                         )
                         try:
-                            # Try to reinitialize browser
+                            # Retire the failed crawler (unless a concurrent scrape already
+                            # replaced it), then reinitialize the browser
+                            if self.crawler is crawler:
+                                await self._cleanup_browser(discard=True)
                             await self.initialize()
                             # Don't count this as a retry attempt - continue loop
                             continue
@@ -769,6 +1192,117 @@ class Crawl4AIWrapper:
         self._browser_reinit_attempts = 0
         return result
 
+    def _get_run_config(
+        self,
+        full_scroll: bool,
+        extraction_strategy: Optional[Any],
+        wait_for: Optional[str],
+        css_selector: Optional[str]
+    ) -> Any:
+        """Return a CrawlerRunConfig for these crawl options, building it only once.
+
+        The config only varies by the scroll script and the per-call options, so
+        retries and the URLs of a batch share one instance instead of each
+        constructing (and validating) their own.
+        """
+        key = (full_scroll, id(extraction_strategy), wait_for, css_selector)
+        entry = self._run_configs.get(key)
+        # The strategy is keyed by id(); holding it in the entry keeps that id from being reused
+        if entry is not None and entry[0] is extraction_strategy:
+            return entry[1]
+
+        if len(self._run_configs) >= _MAX_RUN_CONFIGS:
+            self._run_configs.clear()
+        run_config = CrawlerRunConfig(
+            word_count_threshold=self.config.min_content_length,
+            extraction_strategy=extraction_strategy,
+            bypass_cache=False,
+            js_code=_JS_SCROLL_ECOMMERCE if full_scroll else _JS_SCROLL_GENERIC,
+            wait_for=wait_for or _DEFAULT_WAIT_FOR,
+            css_selector=css_selector or "body",
+            simulate_user=self.config.simulate_user,
+            override_navigator=True,
+        )
+        self._run_configs[key] = (extraction_strategy, run_config)
+        return run_config
+
+    def _needs_scroll(self, domain: str) -> bool:
+        """Whether pages of this domain still need the full scroll-and-click script."""
+        profile = self._domain_profile.get(domain)
+        return profile is None or profile['needed_scroll']
+
+    def _update_domain_profile(self, domain: str, content_length: int, expanded: bool):
+        """Learn from a successful browser scrape whether the domain needs the full script.
+
+        A domain needs it once the script had to click something open, or when a page
+        came back thin (under 3x min_content_length). Both are sticky, so a domain
+        only ever moves from the short path back to the full one.
+        """
+        profile = self._domain_profile.setdefault(
+            domain, {'avg_content': 0, 'samples': 0, 'needed_scroll': False})
+        profile['samples'] += 1
+        profile['avg_content'] += (content_length - profile['avg_content']) // profile['samples']
+        if expanded or content_length < self.config.min_content_length * 3:
+            profile['needed_scroll'] = True
+
+    def _start_scrape_tasks(
+        self,
+        urls: List[str],
+        extraction_strategy: Optional[Any]
+    ) -> List["asyncio.Task[ScrapingResult]"]:
+        """Start one task per URL, all sharing a single concurrency semaphore."""
+        # One semaphore for the whole run: a slot freed by a fast URL is taken by the
+        # next one straight away instead of waiting for the rest of a fixed batch
+        semaphore = asyncio.BoundedSemaphore(self.config.max_concurrent)
+
+        async def scrape_with_semaphore(url: str) -> ScrapingResult:
+            try:
+                async with semaphore:
+                    result = await self.scrape_url(url, extraction_strategy)
+            except Exception as e:
+                return ScrapingResult(
+                    url=url,
+                    success=False,
+                    error_message=f"Batch processing error: {str(e)}"
+                )
+            # Add delay between requests (after releasing the slot, so it doesn't block other URLs)
+            if self.config.delay_between_requests > 0:
+                await asyncio.sleep(self.config.delay_between_requests)
+            return result
+
+        return [asyncio.create_task(scrape_with_semaphore(url)) for url in urls]
+
+    async def iter_scrape_urls(
+        self,
+        urls: List[str],
+        extraction_strategy: Optional[Any] = None
+    ) -> AsyncIterator[ScrapingResult]:
+        """Scrape multiple URLs, yielding each result as soon as it finishes.
+
+        Results come in completion order, not input order (use result.url to match
+        them up). Lets callers start post-processing before the slowest URL is done.
+
+        Args:
+            urls: List of URLs to scrape
+            extraction_strategy: Optional extraction strategy
+
+        Yields:
+            ScrapingResult objects
+        """
+        if not urls:
+            return
+
+        tasks = self._start_scrape_tasks(urls, extraction_strategy)
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Don't leave scrapes running if the caller stopped iterating early
+            for task in tasks:
+                task.cancel()
+
+        logger.info(f"Completed {len(urls)} URLs")
+
     async def scrape_urls(
         self,
         urls: List[str],
@@ -781,46 +1315,14 @@ class Crawl4AIWrapper:
             extraction_strategy: Optional extraction strategy
 
         Returns:
-            List of ScrapingResult objects
+            List of ScrapingResult objects, in the same order as urls
         """
         if not urls:
             return []
 
-        results = []
+        results = await asyncio.gather(*self._start_scrape_tasks(urls, extraction_strategy))
 
-        # Process URLs in batches to control concurrency
-        batch_size = self.config.max_concurrent
-
-        for i in range(0, len(urls), batch_size):
-            batch = urls[i:i + batch_size]
-
-            # Create semaphore to limit concurrent requests
-            semaphore = asyncio.Semaphore(batch_size)
-
-            async def scrape_with_semaphore(url: str) -> ScrapingResult:
-                async with semaphore:
-                    result = await self.scrape_url(url, extraction_strategy)
-                    # Add delay between requests
-                    if self.config.delay_between_requests > 0:
-                        await asyncio.sleep(self.config.delay_between_requests)
-                    return result
-
-            # Process batch concurrently
-            batch_tasks = [scrape_with_semaphore(url) for url in batch]
-            batch_results = await asyncio.gather(*batch_tasks, return_exceptions=True)
-
-            # Handle exceptions in results
-            for url, batch_result in zip(batch, batch_results):
-                if isinstance(batch_result, Exception):
-                    results.append(ScrapingResult(
-                        url=url,
-                        success=False,
-                        error_message=f"Batch processing error: {str(batch_result)}"
-                    ))
-                else:
-                    results.append(batch_result)
-
-            logger.info(f"Completed batch {i//batch_size + 1}/{(len(urls) + batch_size - 1)//batch_size}")
+        logger.info(f"Completed {len(urls)} URLs")
 
         return results
 
@@ -869,15 +1371,23 @@ class Crawl4AIWrapper:
             verbose=self.config.verbose
         )
 
-    def format_results(self, results: List[ScrapingResult], format_type: str = "json") -> str:
+    def _result_is_ecommerce(self, result: ScrapingResult) -> bool:
+        """Read the is_ecommerce flag set by scrape_url, parsing the URL only if it is missing."""
+        flag = result.metadata.get('is_ecommerce') if result.metadata else None
+        return flag if flag is not None else self.is_ecommerce_url(result.url)
+
+    def format_results(self, results: List[ScrapingResult], format_type: str = "json",
+                       file: Optional[TextIO] = None) -> Optional[str]:
         """Format scraping results for output.
 
         Args:
             results: List of ScrapingResult objects
             format_type: Output format ('json', 'csv', 'markdown')
+            file: Optional text file to write the output to (CSV rows are
+                streamed into it rather than built up in memory)
 
         Returns:
-            Formatted string
+            Formatted string, or None if the output was written to file
 
         Note:
             If any of the results contain e-commerce URLs from supported retailers
@@ -885,7 +1395,7 @@ class Crawl4AIWrapper:
             to ensure proper structured data handling for e-commerce content.
         """
         # Check if any results contain e-commerce URLs
-        has_ecommerce_urls = any(self.is_ecommerce_url(result.url) for result in results)
+        has_ecommerce_urls = any(self._result_is_ecommerce(result) for result in results)
 
         # Force JSON format for e-commerce URLs if CSV was requested
         if has_ecommerce_urls and format_type.lower() == "csv":
@@ -893,72 +1403,99 @@ class Crawl4AIWrapper:
             format_type = "json"
 
         if format_type.lower() == "json":
-            return json.dumps([asdict(result) for result in results], indent=2)
+            if ORJSON_AVAILABLE:
+                # Serializes the dataclasses directly, without asdict() copies
+                output = orjson.dumps(results, default=str, option=orjson.OPT_INDENT_2).decode()
+            else:
+                output = json.dumps([asdict(result) for result in results], indent=2)
 
         elif format_type.lower() == "csv":
             import csv
             import io
 
             if not results:
-                return ""
-
-            output = io.StringIO()
-
-            # Write header
-            fieldnames = ['url', 'success', 'content_length', 'links_count',
-                         'images_count', 'status_code', 'error_message']
-            writer = csv.DictWriter(output, fieldnames=fieldnames)
-            writer.writeheader()
-
-            # Write rows
-            for result in results:
-                writer.writerow({
-                    'url': result.url,
-                    'success': result.success,
-                    'content_length': len(result.content) if result.content else 0,
-                    'links_count': len(result.links),
-                    'images_count': len(result.images),
-                    'status_code': result.status_code or '',
-                    'error_message': result.error_message or '',
-                })
-
-            return output.getvalue()
+                output = ""
+            else:
+                buffer = io.StringIO() if file is None else file
+                writer = csv.writer(buffer)
+
+                # Write header
+                writer.writerow(('url', 'success', 'content_length', 'links_count',
+                                 'images_count', 'status_code', 'error_message'))
+
+                # Write rows (summary fields only; content/html don't belong in CSV cells)
+                writer.writerows((
+                    result.url,
+                    result.success,
+                    len(result.content) if result.content else 0,
+                    len(result.links),
+                    len(result.images),
+                    result.status_code or '',
+                    result.error_message or '',
+                ) for result in results)
+
+                if file is not None:
+                    return None
+                output = buffer.getvalue()
 
         elif format_type.lower() == "markdown":
+            import io
+
             if not results:
-                return "# No Results\n"
-
-            output = ["# Scraping Results\n"]
-            output.append(f"Total URLs processed: {len(results)}")
-            output.append(f"Successful: {sum(1 for r in results if r.success)}")
-            output.append(f"Failed: {sum(1 for r in results if not r.success)}\n")
-
-            for result in results:
-                output.append(f"## {result.url}")
-                output.append(f"**Status:** {'✅ Success' if result.success else '❌ Failed'}")
-
-                if result.success:
-                    if result.metadata.get('title'):
-                        output.append(f"**Title:** {result.metadata['title']}")
-                    if result.content:
-                        output.append(f"**Content Length:** {len(result.content)} characters")
-                    if result.links:
-                        output.append(f"**Links Found:** {len(result.links)}")
-                    if result.images:
-                        output.append(f"**Images Found:** {len(result.images)}")
-                    if result.markdown:
-                        preview = result.markdown[:200] + "..." if len(result.markdown) > 200 else result.markdown
-                        output.append(f"**Content Preview:**\n{preview}")
-                else:
-                    output.append(f"**Error:** {result.error_message}")
+                output = "# No Results\n"
+            else:
+                successful = sum(1 for r in results if r.success)
+                buffer = io.StringIO() if file is None else file
+                buffer.write(
+                    "# Scraping Results\n\n"
+                    f"Total URLs processed: {len(results)}\n"
+                    f"Successful: {successful}\n"
+                    f"Failed: {len(results) - successful}\n\n"
+                )
 
-                output.append("")  # Empty line between results
+                for i, result in enumerate(results):
+                    if i:
+                        buffer.write("\n")  # Empty line between results
+                    success, content, markdown = result.success, result.content, result.markdown
+                    buffer.write(f"## {result.url}\n"
+                                 f"**Status:** {'✅ Success' if success else '❌ Failed'}\n")
+
+                    if success:
+                        title = result.metadata.get('title')
+                        if title:
+                            buffer.write(f"**Title:** {title}\n")
+                        if content:
+                            buffer.write(f"**Content Length:** {len(content)} characters\n")
+                        if result.links:
+                            buffer.write(f"**Links Found:** {len(result.links)}\n")
+                        if result.images:
+                            buffer.write(f"**Images Found:** {len(result.images)}\n")
+                        if markdown:
+                            preview = markdown[:200] + "..." if len(markdown) > 200 else markdown
+                            buffer.write(f"**Content Preview:**\n{preview}\n")
+                    else:
+                        buffer.write(f"**Error:** {result.error_message}\n")
 
-            return "\n".join(output)
+                if file is not None:
+                    return None
+                output = buffer.getvalue()
 
         else:
             raise ValueError(f"Unsupported format type: {format_type}")
 
+        if file is not None:
+            file.write(output)
+            return None
+        return output
+
+    async def format_results_async(self, results: List[ScrapingResult], format_type: str = "json",
+                                   file: Optional[TextIO] = None) -> Optional[str]:
+        """Like format_results, but serializes in a worker thread.
+
+        Use from async code so a large JSON/CSV dump doesn't block the event loop.
+        """
+        return await asyncio.to_thread(self.format_results, results, format_type, file)
+
     def get_domain_from_url(self, url: str) -> str:
         """Extract domain name from URL.
 
@@ -966,15 +1503,10 @@ class Crawl4AIWrapper:
             url: URL to extract domain from
 
         Returns:
-            Domain name as string
+            Domain name as string ("unknown_domain" if the URL has no host)
         """
         try:
-            parsed = urllib.parse.urlparse(url)
-            domain = parsed.netloc.lower()
-            # Remove www. prefix if present
-            if domain.startswith('www.'):
-                domain = domain[4:]
-            return domain
+            return _extract_domain(url) or "unknown_domain"
         except Exception as e:
             logger.warning(f"Failed to extract domain from {url}: {e}")
             return "unknown_domain"
@@ -993,47 +1525,30 @@ class Crawl4AIWrapper:
         if metadata is None:
             metadata = {}
 
-        url_lower = url.lower()
-
         # Check URL patterns first
-        if any(pattern in url_lower for pattern in ['/product', '/item', '/shop', '/buy', '/cart']):
-            return 'products'
-        elif any(pattern in url_lower for pattern in ['/article', '/blog', '/news', '/post', '/story']):
-            return 'articles'
-        elif any(pattern in url_lower for pattern in ['/doc', '/documentation', '/guide', '/help', '/wiki']):
-            return 'documentation'
-        elif any(pattern in url_lower for pattern in ['/api', '/endpoint', '/service']):
-            return 'api'
-        elif any(pattern in url_lower for pattern in ['/forum', '/discussion', '/thread', '/comment']):
-            return 'forum'
-        elif any(pattern in url_lower for pattern in ['/video', '/watch', '/play', '/stream']):
-            return 'video'
+        content_type = _classify_url(url)
+        if content_type:
+            return content_type
 
         # Check metadata if available
         title = str(metadata.get('title', '')).lower()
         description = str(metadata.get('description', '')).lower()
 
-        if any(keyword in title + description for keyword in ['product', 'buy', 'price', 'shop', 'cart', 'purchase']):
-            return 'products'
-        elif any(keyword in title + description for keyword in ['article', 'blog', 'news', 'post', 'story', 'published']):
-            return 'articles'
-        elif any(keyword in title + description for keyword in ['documentation', 'guide', 'help', 'manual', 'tutorial']):
-            return 'documentation'
+        content_type = _METADATA_TYPES.classify(title + description)
+        if content_type:
+            return content_type
 
         # Analyze content if available
         if content:
-            content_lower = content.lower()
-            if any(keyword in content_lower for keyword in ['price', 'cart', 'checkout', 'buy now', 'add to cart']):
-                return 'products'
-            elif any(keyword in content_lower for keyword in ['article', 'published', 'author', 'posted on']):
-                return 'articles'
-            elif any(keyword in content_lower for keyword in ['documentation', 'guide', 'tutorial', 'step by step']):
-                return 'documentation'
+            content_type = _CONTENT_TYPES.classify(content.lower())
+            if content_type:
+                return content_type
 
         # Additional heuristics based on common patterns
-        if any(site in domain for site in ['amazon', 'ebay', 'shopify', 'woocommerce'] for domain in [self.get_domain_from_url(url)]):
+        domain = self.get_domain_from_url(url)
+        if any(token in domain for token in _PRODUCT_DOMAIN_TOKENS):
             return 'products'
-        elif any(site in domain for site in ['wikipedia', 'wiki', 'docs'] for domain in [self.get_domain_from_url(url)]):
+        elif any(token in domain for token in _DOC_DOMAIN_TOKENS):
             return 'documentation'
 
         # Default fallback
@@ -1050,14 +1565,20 @@ class Crawl4AIWrapper:
         """
         if not result.metadata:
             result.metadata = {}
+        metadata = result.metadata
+
+        # domain/content_type are computed only if missing, so scrape_url's values
+        # (or an earlier enhance) are reused instead of re-detected
+        if 'domain' not in metadata:
+            metadata['domain'] = self.get_domain_from_url(result.url)
+        if 'content_type' not in metadata:
+            metadata['content_type'] = self.detect_content_type(result.url, result.content, metadata)
 
         # Add organization-specific metadata
-        result.metadata.update({
-            'domain': result.metadata.get('domain', self.get_domain_from_url(result.url)),
-            'content_type': result.metadata.get('content_type', self.detect_content_type(result.url, result.content, result.metadata)),
+        metadata.update({
             'organization_timestamp': result.timestamp,
             'result_id': f"{result.url}_{int(result.timestamp)}",
-            'has_content': bool(result.content and len(result.content.strip()) > 100),
+            'has_content': _stripped_longer_than(result.content, 100),
             'has_links': bool(result.links and len(result.links) > 0),
             'has_images': bool(result.images and len(result.images) > 0),
         })
@@ -1082,8 +1603,11 @@ async def scrape_single_url(
         ScrapingResult object
     """
     wrapper = Crawl4AIWrapper(config or ScrapingConfig())
-    async with wrapper:
-        return await wrapper.scrape_url(url, extraction_strategy)
+    try:
+        async with wrapper:
+            return await wrapper.scrape_url(url, extraction_strategy)
+    finally:
+        await close_browser_pool()
 
 
 async def scrape_multiple_urls(
@@ -1102,8 +1626,11 @@ async def scrape_multiple_urls(
         List of ScrapingResult objects
     """
     wrapper = Crawl4AIWrapper(config or ScrapingConfig())
-    async with wrapper:
-        return await wrapper.scrape_urls(urls, extraction_strategy)
+    try:
+        async with wrapper:
+            return await wrapper.scrape_urls(urls, extraction_strategy)
+    finally:
+        await close_browser_pool()
 
 
 def create_simple_config(**kwargs) -> ScrapingConfig:
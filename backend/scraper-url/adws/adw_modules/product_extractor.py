@@ -7,17 +7,98 @@ product information from various e-commerce website structures.
 
 import re
 import json
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, Iterator, List, Any, Optional, Tuple, Union
 from urllib.parse import urljoin, urlparse
 
 from .product_schemas import ProductData, PriceParser, normalize_product_data
 
+# Optional C extensions (orjson, selectolax) are imported on first extractor
+# instantiation so importing this module stays cheap; see _load_optional_modules.
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch either.
+_json_loads = json.loads
+HTMLParser = None
+_optional_modules_loaded = False
+
+
+def _load_optional_modules() -> None:
+    """Swap in orjson / selectolax if installed (runs once per process)."""
+    global _json_loads, HTMLParser, _optional_modules_loaded
+    if _optional_modules_loaded:
+        return
+    _optional_modules_loaded = True
+
+    try:
+        import orjson
+        _json_loads = orjson.loads
+    except ImportError:
+        pass
+
+    try:
+        from selectolax.parser import HTMLParser as _HTMLParser
+        HTMLParser = _HTMLParser
+    except ImportError:
+        pass
+
+
+# DoHome price patterns, precompiled, in priority order (see _search_by_priority)
+_DOHOME_PRICE_PATTERNS = tuple(re.compile(pattern, re.DOTALL | re.IGNORECASE) for pattern in (
+    # DoHome main price: <span class="text-3xl font-semibold text-[#343A40]">฿1,090.00</span>
+    r'<span[^>]*class="[^"]*text-3xl[^"]*font-semibold[^"]*"[^>]*>฿?([\d,]+(?:\.\d{2})?)</span>',
+    # JSON data in page: "marketPrice":"฿1,090.00"
+    r'"marketPrice"\s*:\s*"฿?([\d,]+(?:\.\d{2})?)"',
+    # Sale price in JSON: "salePrice":"฿999.00"
+    r'"salePrice"\s*:\s*"฿?([\d,]+(?:\.\d{2})?)"',
+    # Generic price with ฿ symbol
+    r'>฿([\d,]+(?:\.\d{2})?)<',
+    # Legacy patterns
+    r'<span[^>]*class="[^"]*price[^"]*"[^>]*>(.*?)</span>',
+    r'ราคา[:\s]*([฿]?[\d,]+\.?\d*)',
+))
+
+_DOHOME_ORIG_PRICE_PATTERNS = tuple(re.compile(pattern, re.DOTALL | re.IGNORECASE) for pattern in (
+    # DoHome 2024 pattern - strikethrough <s> tag for original price
+    # Format: <s class="text-[16px] text-[#343A40] font-light">฿937.00</s>
+    r'<s[^>]*>฿?([\d,]+(?:\.\d{2})?)</s>',
+    r'<span[^>]*class="[^"]*old-price[^"]*"[^>]*>(.*?)</span>',
+    r'<span[^>]*class="[^"]*regular-price[^"]*"[^>]*>(.*?)</span>',
+    r'ราคาปกติ[:\s]*([฿]?[\d,]+\.?\d*)',
+))
+
+# MegaHome gallery images: <img id="image-index-0" src="...">
+_IMG_INDEX_RE = re.compile(r'<img[^>]*id="image-index-\d+"[^>]*src="([^"]+)"')
+
+# GlobalHouse images from the image-gbh.com CDN
+_GBH_IMG_RE = re.compile(r'https://www\.image-gbh\.com/uploads/[^"&\s]+\.(?:jpg|jpeg|png)')
+
+# Brand candidates containing these words are page chrome, not a brand name
+_BRAND_BLACKLIST_RE = re.compile(r'attribute|product|sku|stock|link', re.IGNORECASE)
+
+# Breadcrumb entries that are navigation rather than a product category
+_DOHOME_SKIP_CATEGORIES = frozenset({'หน้าแรก', 'home', 'สินค้า', 'products', 'dohome'})
+_GLOBALHOUSE_SKIP_CATEGORIES = frozenset({'หน้าแรก', 'หมวดหมู่', 'สินค้า'})
+
+
+def _search_by_priority(patterns: Tuple[re.Pattern, ...], text: str) -> Iterator[str]:
+    """Yield the first capture of each pattern that matches text, in pattern order.
+
+    Each pattern is searched separately: merged into one alternation, an earlier
+    match of a broad pattern (e.g. a wrapping price span) would hide a nested
+    match of a preferred one.
+    """
+    for pattern in patterns:
+        match = pattern.search(text)
+        if match:
+            yield match.group(1)
+
 
 class ProductExtractor:
     """Extracts product data from e-commerce web pages."""
 
+    _JSON_LD_RE = re.compile(r'<script type="application/ld\+json">(.*?)</script>', re.DOTALL)
+
     def __init__(self, base_url: str = None):
         """Initialize the extractor with base URL for resolving relative URLs."""
+        _load_optional_modules()
         self.base_url = base_url
 
     def extract_from_html(self, html_content: str, url: str = None) -> Optional[ProductData]:
@@ -172,6 +253,24 @@ class ProductExtractor:
 
         return parsed
 
+    def _extract_json_ld(self, html_content: str) -> Optional[Dict[str, Any]]:
+        """Extract and parse the Product JSON-LD block from HTML."""
+        try:
+            for match in self._JSON_LD_RE.finditer(html_content):
+                try:
+                    data = _json_loads(match.group(1))
+                    if isinstance(data, dict) and data.get('@type') == 'Product':
+                        return data
+                    elif isinstance(data, list):
+                        for item in data:
+                            if isinstance(item, dict) and item.get('@type') == 'Product':
+                                return item
+                except json.JSONDecodeError:
+                    continue
+        except Exception:
+            pass
+        return None
+
     def _extract_product_name(self, html_content: str) -> Optional[str]:
         """Extract product name from HTML."""
         # Common selectors for product name
@@ -1376,31 +1475,15 @@ class ThaiWatsaduExtractor(ProductExtractor):
 
         return specs
 
-    def _extract_json_ld(self, html_content: str) -> Optional[Dict[str, Any]]:
-        """Extract and parse JSON-LD data from HTML."""
-        try:
-            pattern = r'<script type="application/ld\+json">(.*?)</script>'
-            matches = re.finditer(pattern, html_content, re.DOTALL)
-
-            for match in matches:
-                try:
-                    data = json.loads(match.group(1))
-                    if isinstance(data, dict) and data.get('@type') == 'Product':
-                        return data
-                    elif isinstance(data, list):
-                        for item in data:
-                            if isinstance(item, dict) and item.get('@type') == 'Product':
-                                return item
-                except json.JSONDecodeError:
-                    continue
-        except Exception:
-            pass
-        return None
-
 
 class HomeProExtractor(ProductExtractor):
     """Specialized extractor for HomePro website with enhanced JSON-LD and field sanitization."""
 
+    # HomePro script tags carry extra attributes and either quote style
+    _JSON_LD_RE = re.compile(
+        r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.DOTALL
+    )
+
     # HomePro specific strings to filter out
     HOMEPRO_FILTER_STRINGS = [
         'homepro', 'home pro', 'โฮมโปร',
@@ -1787,27 +1870,6 @@ class HomeProExtractor(ProductExtractor):
 
         return specs
 
-    def _extract_json_ld(self, html_content: str) -> Optional[Dict[str, Any]]:
-        """Extract and parse JSON-LD data from HTML."""
-        try:
-            pattern = r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>'
-            matches = re.finditer(pattern, html_content, re.DOTALL)
-
-            for match in matches:
-                try:
-                    data = json.loads(match.group(1))
-                    if isinstance(data, dict) and data.get('@type') == 'Product':
-                        return data
-                    elif isinstance(data, list):
-                        for item in data:
-                            if isinstance(item, dict) and item.get('@type') == 'Product':
-                                return item
-                except json.JSONDecodeError:
-                    continue
-        except Exception:
-            pass
-        return None
-
 
 class BoonthavornExtractor(ProductExtractor):
     """Specialized extractor for Boonthavorn website using JSON-LD with enhanced sanitization."""
@@ -1977,30 +2039,6 @@ class BoonthavornExtractor(ProductExtractor):
         product.retailer = "Boonthavorn"
         return product
 
-    def _extract_json_ld(self, html_content: str) -> Optional[Dict[str, Any]]:
-        """Extract and parse JSON-LD data from HTML."""
-        try:
-            # Regex to find the script tag content
-            pattern = r'<script type="application/ld\+json">(.*?)</script>'
-            matches = re.finditer(pattern, html_content, re.DOTALL)
-            
-            for match in matches:
-                try:
-                    data = json.loads(match.group(1))
-                    # We are looking for @type Product
-                    if isinstance(data, dict) and data.get('@type') == 'Product':
-                        return data
-                    # Sometimes it's a list of objects
-                    elif isinstance(data, list):
-                        for item in data:
-                            if isinstance(item, dict) and item.get('@type') == 'Product':
-                                return item
-                except json.JSONDecodeError:
-                    continue
-        except Exception:
-            pass
-        return None
-
 
 class MegaHomeExtractor(ProductExtractor):
     """Specialized extractor for Mega Home website with specific HTML patterns."""
@@ -2098,12 +2136,8 @@ class MegaHomeExtractor(ProductExtractor):
                 product.volume = weight_val + ' kg'
 
         # 7. Extract images from image-index elements
-        images = []
-        img_matches = re.findall(r'<img[^>]*id="image-index-\d+"[^>]*src="([^"]+)"', html_content)
-        for img_url in img_matches:
-            if img_url and img_url not in images:
-                images.append(img_url)
-        product.images = images
+        # dict.fromkeys dedupes in O(n) while preserving order
+        product.images = list(dict.fromkeys(_IMG_INDEX_RE.findall(html_content)))
 
         # 8. Extract category from breadcrumb (last item before product)
         breadcrumb_match = re.search(r'<div class="active section">([^<]+)</div>', html_content)
@@ -2189,53 +2223,26 @@ class DoHomeExtractor(ProductExtractor):
         # 3. Extract price from DoHome-specific patterns
         if not product.current_price:
             # DoHome uses Next.js/React with Tailwind CSS classes
-            price_patterns = [
-                # DoHome main price: <span class="text-3xl font-semibold text-[#343A40]">฿1,090.00</span>
-                r'<span[^>]*class="[^"]*text-3xl[^"]*font-semibold[^"]*"[^>]*>฿?([\d,]+(?:\.\d{2})?)</span>',
-                # JSON data in page: "marketPrice":"฿1,090.00"
-                r'"marketPrice"\s*:\s*"฿?([\d,]+(?:\.\d{2})?)"',
-                # Sale price in JSON: "salePrice":"฿999.00"
-                r'"salePrice"\s*:\s*"฿?([\d,]+(?:\.\d{2})?)"',
-                # Generic price with ฿ symbol
-                r'>฿([\d,]+(?:\.\d{2})?)<',
-                # Legacy patterns
-                r'<span[^>]*class="[^"]*price[^"]*"[^>]*>(.*?)</span>',
-                r'ราคา[:\s]*([฿]?[\d,]+\.?\d*)',
-            ]
-            for pattern in price_patterns:
-                match = re.search(pattern, html_content, re.DOTALL | re.IGNORECASE)
-                if match:
-                    price_text = self._clean_text(match.group(1))
-                    price = PriceParser.parse_price(price_text)
-                    if price and price > 0:
-                        product.current_price = price
-                        break
+            for price_text in _search_by_priority(_DOHOME_PRICE_PATTERNS, html_content):
+                price = PriceParser.parse_price(self._clean_text(price_text))
+                if price and price > 0:
+                    product.current_price = price
+                    break
 
         # 4. Extract original price
         if not product.original_price:
-            orig_patterns = [
-                # DoHome 2024 pattern - strikethrough <s> tag for original price
-                # Format: <s class="text-[16px] text-[#343A40] font-light">฿937.00</s>
-                r'<s[^>]*>฿?([\d,]+(?:\.\d{2})?)</s>',
-                r'<span[^>]*class="[^"]*old-price[^"]*"[^>]*>(.*?)</span>',
-                r'<span[^>]*class="[^"]*regular-price[^"]*"[^>]*>(.*?)</span>',
-                r'ราคาปกติ[:\s]*([฿]?[\d,]+\.?\d*)',
-            ]
-            for pattern in orig_patterns:
-                match = re.search(pattern, html_content, re.DOTALL | re.IGNORECASE)
-                if match:
-                    price_text = self._clean_text(match.group(1))
-                    price = PriceParser.parse_price(price_text)
-                    if price and price > 0:
-                        product.original_price = price
-                        break
+            for price_text in _search_by_priority(_DOHOME_ORIG_PRICE_PATTERNS, html_content):
+                price = PriceParser.parse_price(self._clean_text(price_text))
+                if price and price > 0:
+                    product.original_price = price
+                    break
 
         # 5. Extract SKU from URL pattern: /product/product-name-SKU
         if url and not product.sku:
             # DoHome URL pattern: /product/product-name-10026550
-            sku_match = re.search(r'-(\d{6,})(?:\?|$)', url)
-            if sku_match:
-                potential_sku = sku_match.group(1)
+            tail = url.split('?', 1)[0].rsplit('-', 1)
+            if len(tail) == 2 and len(tail[1]) >= 6 and tail[1].isdecimal():
+                potential_sku = tail[1]
                 if self._is_valid_sku(potential_sku):
                     product.sku = potential_sku
 
@@ -2252,7 +2259,7 @@ class DoHomeExtractor(ProductExtractor):
                 if match:
                     brand = self._clean_text(match.group(1))
                     # Validate brand - must be short and not contain garbage
-                    if brand and len(brand) < 50 and not any(x in brand.lower() for x in ['attribute', 'product', 'sku', 'stock', 'link']):
+                    if brand and len(brand) < 50 and not _BRAND_BLACKLIST_RE.search(brand):
                         product.brand = brand.strip()
                         break
 
@@ -2267,7 +2274,7 @@ class DoHomeExtractor(ProductExtractor):
                 matches = re.findall(pattern, html_content, re.IGNORECASE)
                 for cat in matches:
                     cat = self._clean_text(cat)
-                    if cat and len(cat) > 2 and cat.lower() not in ['หน้าแรก', 'home', 'สินค้า', 'products', 'dohome']:
+                    if cat and len(cat) > 2 and cat.lower() not in _DOHOME_SKIP_CATEGORIES:
                         product.category = cat
                         break
                 if product.category:
@@ -2306,27 +2313,6 @@ class DoHomeExtractor(ProductExtractor):
         product.retailer = "DoHome"
         return product
 
-    def _extract_json_ld(self, html_content: str) -> Optional[Dict[str, Any]]:
-        """Extract and parse JSON-LD data from HTML."""
-        try:
-            pattern = r'<script type="application/ld\+json">(.*?)</script>'
-            matches = re.finditer(pattern, html_content, re.DOTALL)
-
-            for match in matches:
-                try:
-                    data = json.loads(match.group(1))
-                    if isinstance(data, dict) and data.get('@type') == 'Product':
-                        return data
-                    elif isinstance(data, list):
-                        for item in data:
-                            if isinstance(item, dict) and item.get('@type') == 'Product':
-                                return item
-                except json.JSONDecodeError:
-                    continue
-        except Exception:
-            pass
-        return None
-
 
 class GlobalHouseExtractor(ProductExtractor):
     """Specialized extractor for Global House website."""
@@ -2380,9 +2366,13 @@ class GlobalHouseExtractor(ProductExtractor):
                 html_contents = ast_data.get('htmlContent', [])
                 for hc in html_contents:
                     if hc.get('title') == 'คุณสมบัติเด่น' and hc.get('detail'):
-                        # Strip HTML tags
-                        desc = re.sub(r'<[^>]+>', ' ', hc.get('detail', ''))
-                        desc = re.sub(r'\s+', ' ', desc).strip()
+                        # Strip HTML tags; str.split() collapses whitespace
+                        detail = hc.get('detail', '')
+                        if HTMLParser is not None:
+                            detail = HTMLParser(detail).text(separator=' ', strip=True)
+                        else:
+                            detail = re.sub(r'<[^>]+>', ' ', detail)
+                        desc = ' '.join(detail.split())
                         if desc and len(desc) > 10:
                             product.description = desc[:500]  # Limit length
                             break
@@ -2489,9 +2479,9 @@ class GlobalHouseExtractor(ProductExtractor):
         # 5. Extract SKU from URL pattern: /product/BRAND-NAME-i.SKU
         if url and not product.sku:
             # Global House URL pattern: /product/MAZUMA-...-i.8852163012022
-            sku_match = re.search(r'-i\.(\d+)(?:\?|$)', url)
-            if sku_match:
-                potential_sku = sku_match.group(1)
+            tail = url.split('?', 1)[0].rsplit('-i.', 1)
+            if len(tail) == 2 and tail[1].isdecimal():
+                potential_sku = tail[1]
                 if self._is_valid_sku(potential_sku):
                     product.sku = potential_sku
 
@@ -2526,7 +2516,7 @@ class GlobalHouseExtractor(ProductExtractor):
         if breadcrumb_matches:
             # Get the last category (most specific), but not if it's the home or generic pages
             for cat in reversed(breadcrumb_matches):
-                if cat and cat not in ['หน้าแรก', 'หมวดหมู่', 'สินค้า'] and len(cat) > 2:
+                if cat and cat not in _GLOBALHOUSE_SKIP_CATEGORIES and len(cat) > 2:
                     product.category = cat
                     break
 
@@ -2539,18 +2529,10 @@ class GlobalHouseExtractor(ProductExtractor):
         # 9. Extract images from Next.js image srcset
         if not product.images:
             # Look for image URLs from the image-gbh.com CDN
-            img_matches = re.findall(r'https://www\.image-gbh\.com/uploads/[^"&\s]+\.(?:jpg|jpeg|png)', html_content)
+            img_matches = _GBH_IMG_RE.findall(html_content)
             if img_matches:
                 # Remove duplicates and limit
-                seen = set()
-                unique_images = []
-                for img in img_matches:
-                    if img not in seen:
-                        seen.add(img)
-                        unique_images.append(img)
-                        if len(unique_images) >= 10:
-                            break
-                product.images = unique_images
+                product.images = list(dict.fromkeys(img_matches))[:10]
 
         # 10. Don't use base class volume/dimensions extraction - it gives garbage for GlobalHouse
         # GlobalHouse product specs are loaded dynamically via JavaScript
@@ -2563,44 +2545,26 @@ class GlobalHouseExtractor(ProductExtractor):
         product.retailer = "Global House"
         return product
 
-    def _extract_json_ld(self, html_content: str) -> Optional[Dict[str, Any]]:
-        """Extract and parse JSON-LD data from HTML."""
-        try:
-            pattern = r'<script type="application/ld\+json">(.*?)</script>'
-            matches = re.finditer(pattern, html_content, re.DOTALL)
 
-            for match in matches:
-                try:
-                    data = json.loads(match.group(1))
-                    if isinstance(data, dict) and data.get('@type') == 'Product':
-                        return data
-                    elif isinstance(data, list):
-                        for item in data:
-                            if isinstance(item, dict) and item.get('@type') == 'Product':
-                                return item
-                except json.JSONDecodeError:
-                    continue
-        except Exception:
-            pass
-        return None
+# Registered domain (last two labels, or last three for ".co.th") -> extractor
+_REG_DOMAIN = {
+    'thaiwatsadu.com': ThaiWatsaduExtractor,
+    'homepro.co.th': HomeProExtractor,
+    'boonthavorn.com': BoonthavornExtractor,
+    'dohome.co.th': DoHomeExtractor,
+    'megahome.co.th': MegaHomeExtractor,
+    'globalhouse.co.th': GlobalHouseExtractor,
+}
 
 
 def get_extractor(url: str) -> ProductExtractor:
     """Get the appropriate extractor for the given URL."""
-    domain = urlparse(url).netloc.lower()
-
-    if 'thaiwatsadu.com' in domain:
-        return ThaiWatsaduExtractor(url)
-    elif 'homepro.co.th' in domain:
-        return HomeProExtractor(url)
-    elif 'boonthavorn.com' in domain:
-        return BoonthavornExtractor(url)
-    elif 'dohome.co.th' in domain:
-        return DoHomeExtractor(url)
-    elif 'megahome.co.th' in domain:
-        return MegaHomeExtractor(url)
-    elif 'globalhouse.co.th' in domain:
-        return GlobalHouseExtractor(url)
+    host = (urlparse(url).hostname or '').lower()
+    parts = host.rsplit('.', 3)
+
+    if len(parts) >= 3 and parts[-2] == 'co':
+        key = '.'.join(parts[-3:])
     else:
-        return ProductExtractor(url)
+        key = '.'.join(parts[-2:])
 
+    return _REG_DOMAIN.get(key, ProductExtractor)(url)
@@ -0,0 +1,42 @@
+"""Tests for adw_modules.crawl4ai_wrapper"""
+import os
+import sys
+
+# Import adw_modules as a package, as adw_ecommerce_product_scraper.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adw_modules.crawl4ai_wrapper import _EXPANDED_MARKER, _JS_SCROLL_ECOMMERCE
+
+
+def test_ecommerce_scroll_script_sets_expanded_marker():
+    assert f"setAttribute('{_EXPANDED_MARKER}', '1')" in _JS_SCROLL_ECOMMERCE
+    assert "{marker}" not in _JS_SCROLL_ECOMMERCE
+
+
+class _FakeCrawler:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+def test_browser_pool_closes_crawlers_from_previous_event_loop():
+    import asyncio
+    from adw_modules.crawl4ai_wrapper import BrowserPool
+
+    pool = BrowserPool()
+    first = _FakeCrawler()
+
+    async def acquire_and_release(crawler):
+        async def factory():
+            return crawler
+        acquired = await pool.acquire(('key',), factory)
+        await pool.release(acquired)
+        return acquired
+
+    asyncio.run(acquire_and_release(first))
+    assert not first.closed
+    second = asyncio.run(acquire_and_release(_FakeCrawler()))
+    assert first.closed
+    assert second is not first
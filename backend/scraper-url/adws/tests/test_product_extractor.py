@@ -0,0 +1,22 @@
+"""Tests for adw_modules.product_extractor"""
+import os
+import sys
+
+# Import adw_modules as a package, as adw_ecommerce_product_scraper.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adw_modules.product_extractor import DoHomeExtractor
+
+
+def test_dohome_main_price_nested_in_a_price_span():
+    # The wrapping "price" span matches a lower-priority pattern; the nested
+    # text-3xl span must still win, and the <s> price is the original price
+    html = (
+        '<h1>Test Product Name</h1>'
+        '<span class="price-wrap"><s class="x">฿1,200.00</s> '
+        '<span class="text-3xl font-semibold text-[#343A40]">฿1,090.00</span></span>'
+    )
+    product = DoHomeExtractor().extract_from_html(
+        html, 'https://www.dohome.co.th/product/test-product-10026550')
+    assert product.current_price == 1090.0
+    assert product.original_price == 1200.0
@@ -3,73 +3,103 @@ Test database connection
 Run: python test_connection.py
 """
 import os
-import psycopg2
-from dotenv import load_dotenv
+from dataclasses import dataclass
 from urllib.parse import urlparse
 
+import psycopg
+from dotenv import load_dotenv
+
 load_dotenv()
 
-DATABASE_URL = os.environ.get("DATABASE_URL")
 
-if DATABASE_URL:
-    print(f"Using DATABASE_URL")
-    parsed = urlparse(DATABASE_URL)
-    DB_CONFIG = {
-        "host": parsed.hostname,
-        "port": parsed.port or 5432,
-        "database": parsed.path[1:],
-        "user": parsed.username,
-        "password": parsed.password,
-        "sslmode": "require",
-    }
-else:
-    print("Using individual DB_* variables")
-    DB_CONFIG = {
-        "host": os.environ.get("DB_HOST", "localhost"),
-        "port": int(os.environ.get("DB_PORT", 5432)),
-        "database": os.environ.get("DB_NAME", "pricehawk"),
-        "user": os.environ.get("DB_USER", "pricehawk"),
-        "password": os.environ.get("DB_PASSWORD", "pricehawk_secret"),
-        "sslmode": "require",  # Required for Neon
-    }
+@dataclass(frozen=True)
+class DBSettings:
+    """Connection settings parsed once from the environment"""
+    host: str
+    port: int
+    dbname: str
+    user: str
+    password: str
+    sslmode: str
+    source: str
+
+    @classmethod
+    def from_env(cls) -> "DBSettings":
+        env = os.environ
+        # DB_SSLMODE=prefer skips the forced TLS handshake during local development
+        sslmode = env.get("DB_SSLMODE", "require")
+        database_url = env.get("DATABASE_URL")
+        if database_url:
+            parsed = urlparse(database_url)
+            return cls(
+                host=parsed.hostname,
+                port=parsed.port or 5432,
+                dbname=parsed.path[1:],
+                user=parsed.username,
+                password=parsed.password,
+                sslmode=sslmode,
+                source="DATABASE_URL",
+            )
+        return cls(
+            host=env.get("DB_HOST", "localhost"),
+            port=int(env.get("DB_PORT", 5432)),
+            dbname=env.get("DB_NAME", "pricehawk"),
+            user=env.get("DB_USER", "pricehawk"),
+            password=env.get("DB_PASSWORD", "pricehawk_secret"),
+            sslmode=sslmode,  # Required for Neon
+            source="individual DB_* variables",
+        )
+
+    @property
+    def kwargs(self) -> dict:
+        return {
+            "host": self.host,
+            "port": self.port,
+            "dbname": self.dbname,
+            "user": self.user,
+            "password": self.password,
+            "sslmode": self.sslmode,
+        }
 
+
+SETTINGS = DBSettings.from_env()
+
+print(f"Using {SETTINGS.source}")
 print(f"\nConnecting to:")
-print(f"  Host: {DB_CONFIG['host']}")
-print(f"  Port: {DB_CONFIG['port']}")
-print(f"  Database: {DB_CONFIG['database']}")
-print(f"  User: {DB_CONFIG['user']}")
-print(f"  SSL: {DB_CONFIG.get('sslmode', 'disabled')}")
+print(f"  Host: {SETTINGS.host}")
+print(f"  Port: {SETTINGS.port}")
+print(f"  Database: {SETTINGS.dbname}")
+print(f"  User: {SETTINGS.user}")
+print(f"  SSL: {SETTINGS.sslmode}")
 
 try:
     print("\nAttempting connection...")
-    conn = psycopg2.connect(**DB_CONFIG)
+    # A direct connect surfaces the real error (bad password, TLS, DNS) immediately;
+    # autocommit avoids the implicit BEGIN round-trip on the Neon pooler
+    # Version and table list in one statement: a single round-trip after connect
+    with psycopg.connect(**SETTINGS.kwargs, autocommit=True) as conn:
+        rows = conn.execute("""
+            SELECT 'version' AS k, version() AS v
+            UNION ALL
+            SELECT 'table', table_name::text
+            FROM information_schema.tables
+            WHERE table_schema = 'public'
+            ORDER BY 1, 2;
+        """).fetchall()
 
-    cursor = conn.cursor()
-    cursor.execute("SELECT version();")
-    version = cursor.fetchone()[0]
+    version = next(v for k, v in rows if k == "version")
+    tables = [v for k, v in rows if k == "table"]
 
     print(f"\n✓ Connection successful!")
     print(f"  PostgreSQL: {version}")
 
-    # Check if tables exist
-    cursor.execute("""
-        SELECT table_name
-        FROM information_schema.tables
-        WHERE table_schema = 'public'
-        ORDER BY table_name;
-    """)
-    tables = cursor.fetchall()
-
     if tables:
         print(f"\n  Tables found: {len(tables)}")
         for table in tables:
-            print(f"    - {table[0]}")
+            print(f"    - {table}")
     else:
         print("\n  No tables found (database is empty)")
 
-    cursor.close()
-    conn.close()
-
 except Exception as e:
     print(f"\n✗ Connection failed!")
     print(f"  Error: {e}")
@@ -78,7 +78,7 @@ CREATE TABLE IF NOT EXISTS price_history (
 -- Indexes
 CREATE INDEX IF NOT EXISTS idx_products_retailer ON products(retailer_id);
 CREATE INDEX IF NOT EXISTS idx_products_sku ON products(sku);
-CREATE INDEX IF NOT EXISTS idx_price_history_product ON price_history(product_id);
+CREATE INDEX IF NOT EXISTS idx_price_history_product_date ON price_history(product_id, scraped_at DESC);
 CREATE INDEX IF NOT EXISTS idx_price_history_date ON price_history(scraped_at);
 CREATE INDEX IF NOT EXISTS idx_product_matches_base ON product_matches(base_product_id);
 CREATE INDEX IF NOT EXISTS idx_product_matches_candidate ON product_matches(candidate_product_id);
@@ -1,8 +1,24 @@
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from contextlib import contextmanager
+import csv
+import functools
+import io
+import json
+import threading
+from itertools import islice
+from pathlib import Path
+from psycopg2.extras import RealDictCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool
+from contextlib import contextmanager, nullcontext
+from operator import itemgetter
+from types import MappingProxyType
 from datetime import datetime
 
+# Faster JSON parsing for the product files (see load_products)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Database configuration
 DB_CONFIG = {
     "host": "localhost",
@@ -13,53 +29,88 @@ DB_CONFIG = {
 }
 
 
+# Shared connection pool, created on first use (see _get_pool)
+POOL_MAX_CONNECTIONS = 16
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadedConnectionPool:
+    """Get the module-level connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadedConnectionPool(1, POOL_MAX_CONNECTIONS, **DB_CONFIG,
+                                               cursor_factory=RealDictCursor)
+    return _pool
+
+
 @contextmanager
-def get_db():
-    """Get database connection"""
-    conn = psycopg2.connect(**DB_CONFIG, cursor_factory=RealDictCursor)
+def pooled_connection(pool: ThreadedConnectionPool):
+    """
+    Check a connection out of pool for the block: committed on success, rolled
+    back on error, then handed back. Also used by the seeder scripts' get_db.
+    """
+    conn = pool.getconn()
     try:
         yield conn
         conn.commit()
     except Exception:
-        conn.rollback()
+        if not conn.closed:
+            conn.rollback()
         raise
     finally:
-        conn.close()
+        # Drop broken connections instead of handing them to the next caller
+        pool.putconn(conn, close=bool(conn.closed))
 
 
-# Retailer code mapping
-RETAILER_CODES = {
-    "Thai Watsadu": "twd",
-    "HomePro": "hp",
-    "Do Home": "dh",
-    "Boonthavorn": "btv",
-    "Global House": "gbh",
-}
+def get_db():
+    """Get database connection (checked out of the shared pool)"""
+    return pooled_connection(_get_pool())
+
+
+# Retailer name -> (code, domain), shared by the import scripts
+RETAILERS = MappingProxyType({
+    "Thai Watsadu": ("twd", "thaiwatsadu.com"),
+    "HomePro": ("hp", "homepro.co.th"),
+    "Do Home": ("dh", "dohome.co.th"),
+    "Boonthavorn": ("btv", "boonthavorn.com"),
+    "Global House": ("gbh", "globalhouse.co.th"),
+})
 
 
 # Retailer functions
 def get_retailer_code(name: str) -> str:
     """Get retailer code from name"""
-    return RETAILER_CODES.get(name)
+    retailer = RETAILERS.get(name)
+    return retailer[0] if retailer else None
 
 
+@functools.lru_cache(maxsize=32)
 def get_or_create_retailer(name: str, domain: str = None) -> str:
-    """Get retailer by name or create if not exists. Returns retailer_id (code)."""
-    code = RETAILER_CODES.get(name)
-    if not code:
-        raise ValueError(f"Unknown retailer: {name}. Must be one of: {list(RETAILER_CODES.keys())}")
+    """
+    Get retailer by name or create if not exists. Returns retailer_id (code).
+    domain defaults to the retailer's domain in RETAILERS.
+    Retailers never change during a run, so the result is cached per process.
+    """
+    retailer = RETAILERS.get(name)
+    if not retailer:
+        raise ValueError(f"Unknown retailer: {name}. Must be one of: {list(RETAILERS.keys())}")
+    code, default_domain = retailer
+    if domain is None:
+        domain = default_domain
 
+    # Import threads may race to create the same retailer, so the insert
+    # tolerates a concurrent one and the row is read back either way
     with get_db() as conn:
         with conn.cursor() as cur:
-            cur.execute("SELECT retailer_id FROM retailers WHERE retailer_id = %s", (code,))
-            result = cur.fetchone()
-            if result:
-                return result["retailer_id"]
-
             cur.execute(
-                "INSERT INTO retailers (retailer_id, name, domain) VALUES (%s, %s, %s) RETURNING retailer_id",
+                "INSERT INTO retailers (retailer_id, name, domain) VALUES (%s, %s, %s) "
+                "ON CONFLICT (retailer_id) DO NOTHING",
                 (code, name, domain)
             )
+            cur.execute("SELECT retailer_id FROM retailers WHERE retailer_id = %s", (code,))
             return cur.fetchone()["retailer_id"]
 
 
@@ -91,30 +142,96 @@ def upsert_product(retailer_id: str, sku: str, name: str, link: str,
     Insert or update product with price.
     - Updates current_price
     - Updates lowest_price/highest_price
-    - Adds entry to price_history
+    - Adds entry to price_history (unless the price equals the last recorded one)
     """
     with get_db() as conn:
         with conn.cursor() as cur:
-            # Check if product exists to get current lowest/highest
-            cur.execute(
-                "SELECT product_id, lowest_price, highest_price FROM products WHERE retailer_id = %s AND sku = %s",
-                (retailer_id, sku)
-            )
-            existing = cur.fetchone()
+            # Upsert product and add to price history (if price exists) in one
+            # statement. New rows seed lowest/highest with current_price and
+            # LEAST/GREATEST (which skip NULLs) keep the extremes on update
+            cur.execute("""
+                WITH upserted AS (
+                    INSERT INTO products (retailer_id, sku, name, link, brand, category, image, description,
+                                          current_price, original_price, lowest_price, highest_price)
+                    VALUES (%(retailer_id)s, %(sku)s, %(name)s, %(link)s, %(brand)s, %(category)s,
+                            %(image)s, %(description)s, %(current_price)s, %(original_price)s,
+                            %(current_price)s, %(current_price)s)
+                    ON CONFLICT (retailer_id, sku)
+                    DO UPDATE SET
+                        name = EXCLUDED.name,
+                        link = EXCLUDED.link,
+                        brand = EXCLUDED.brand,
+                        category = EXCLUDED.category,
+                        image = EXCLUDED.image,
+                        description = EXCLUDED.description,
+                        current_price = EXCLUDED.current_price,
+                        original_price = EXCLUDED.original_price,
+                        lowest_price = LEAST(products.lowest_price, EXCLUDED.current_price),
+                        highest_price = GREATEST(products.highest_price, EXCLUDED.current_price),
+                        last_updated_at = NOW()
+                    RETURNING product_id
+                ), history AS (
+                    INSERT INTO price_history (product_id, price, currency)
+                    SELECT u.product_id, %(current_price)s, 'THB' FROM upserted u
+                    WHERE %(add_history)s AND NOT EXISTS (
+                        SELECT 1 FROM (
+                            SELECT price FROM price_history ph WHERE ph.product_id = u.product_id
+                            ORDER BY scraped_at DESC LIMIT 1
+                        ) last WHERE last.price = %(current_price)s::DECIMAL(10, 2)
+                    )
+                )
+                SELECT product_id FROM upserted
+            """, {
+                "retailer_id": retailer_id, "sku": sku, "name": name, "link": link,
+                "brand": brand, "category": category, "image": image, "description": description,
+                "current_price": current_price, "original_price": original_price,
+                "add_history": bool(current_price),
+            })
+            return cur.fetchone()["product_id"]
 
-            # Calculate new lowest/highest
-            if existing and current_price:
-                lowest = min(existing["lowest_price"] or current_price, current_price)
-                highest = max(existing["highest_price"] or current_price, current_price)
-            else:
-                lowest = current_price
-                highest = current_price
 
-            # Upsert product
-            cur.execute("""
+# Product JSON keys read by product_rows, in row order ("images" becomes image)
+PRODUCT_FIELDS = ("sku", "name", "url", "brand", "category", "images",
+                  "description", "current_price", "original_price")
+_get_product_fields = itemgetter(*PRODUCT_FIELDS)
+_MISSING_FIELDS = dict.fromkeys(PRODUCT_FIELDS)
+
+
+def product_rows(retailer_id: str, products: list[dict]) -> list[tuple]:
+    """
+    Turn scraped product dicts into bulk_upsert_products rows.
+    Keys missing from a product read as None.
+    """
+    try:
+        fields = list(map(_get_product_fields, products))
+    except KeyError:
+        fields = [_get_product_fields({**_MISSING_FIELDS, **product}) for product in products]
+    return [
+        (retailer_id, sku, name, url, brand, category, images[0] if images else None,
+         description, current_price, original_price)
+        for sku, name, url, brand, category, images, description, current_price, original_price in fields
+    ]
+
+
+def bulk_upsert_products(rows: list[tuple]) -> dict[tuple[str, str], int]:
+    """
+    Insert or update many products in one connection (see upsert_product).
+    rows are (retailer_id, sku, name, link, brand, category, image, description,
+    current_price, original_price) tuples; rows repeating a (retailer_id, sku)
+    are collapsed to the last one, since ON CONFLICT cannot update a row twice.
+    Returns {(retailer_id, sku): product_id}.
+    """
+    unique_rows = list({(row[0], row[1]): row for row in rows}.values())
+    if not unique_rows:
+        return {}
+
+    with get_db() as conn:
+        with conn.cursor() as cur:
+            # New rows seed lowest_price/highest_price with current_price
+            returned = execute_values(cur, """
                 INSERT INTO products (retailer_id, sku, name, link, brand, category, image, description,
                                       current_price, original_price, lowest_price, highest_price)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                VALUES %s
                 ON CONFLICT (retailer_id, sku)
                 DO UPDATE SET
                     name = EXCLUDED.name,
@@ -128,19 +245,226 @@ def upsert_product(retailer_id: str, sku: str, name: str, link: str,
                     lowest_price = LEAST(products.lowest_price, EXCLUDED.current_price),
                     highest_price = GREATEST(products.highest_price, EXCLUDED.current_price),
                     last_updated_at = NOW()
-                RETURNING product_id
-            """, (retailer_id, sku, name, link, brand, category, image, description,
-                  current_price, original_price, lowest, highest))
-            product_id = cur.fetchone()["product_id"]
-
-            # Add to price history if price exists
-            if current_price:
-                cur.execute(
-                    "INSERT INTO price_history (product_id, price, currency) VALUES (%s, %s, 'THB')",
-                    (product_id, current_price)
-                )
+                RETURNING retailer_id, sku, product_id
+            """, [row + (row[8], row[8]) for row in unique_rows], page_size=500, fetch=True)
+            product_ids = {(r["retailer_id"], r["sku"]): r["product_id"] for r in returned}
+
+            # Add to price history where a price exists and differs from the last one
+            history = [(product_ids[(row[0], row[1])], row[8]) for row in unique_rows if row[8]]
+            if history:
+                execute_values(cur, """
+                    INSERT INTO price_history (product_id, price, currency)
+                    SELECT v.product_id, v.price, 'THB'
+                    FROM (VALUES %s) AS v (product_id, price)
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM (
+                            SELECT price FROM price_history ph WHERE ph.product_id = v.product_id
+                            ORDER BY scraped_at DESC LIMIT 1
+                        ) last WHERE last.price = v.price
+                    )
+                """, history, template="(%s, %s::DECIMAL(10, 2))", page_size=500)
+
+            return product_ids
+
+
+def load_products(json_file: Path) -> list[dict]:
+    """Parse a product JSON file (with orjson when installed)"""
+    if ORJSON_AVAILABLE:
+        with open(json_file, "rb") as f:
+            return orjson.loads(f.read())
+    with open(json_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class _CsvNull:
+    """Stands in for None in CsvRowStream rows: numeric to QUOTE_NONNUMERIC, written as nothing"""
+    __slots__ = ()
+
+    def __float__(self) -> float:
+        return 0.0
+
+    def __str__(self) -> str:
+        return ""
+
+
+_CSV_NULL = _CsvNull()
+
+
+class CsvRowStream:
+    """
+    Read-only file object for cursor.copy_expert that CSV-encodes rows as
+    COPY reads them, so only a chunk of the CSV text is in memory at a time.
+    None becomes an unquoted empty field, which COPY reads as NULL. Strings are
+    quoted, so an empty string stays '' instead of also loading as NULL.
+    """
+
+    # Rows encoded each time the unread text runs short of a read
+    CHUNK_ROWS = 100
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buf = io.StringIO()
+        self._writer = csv.writer(self._buf, quoting=csv.QUOTE_NONNUMERIC)
+        self._text = ""
+        self._pos = 0
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._text) - self._pos < size:
+            chunk = list(islice(self._rows, self.CHUNK_ROWS))
+            if not chunk:
+                break
+            self._buf.seek(0)
+            self._buf.truncate()
+            self._writer.writerows(
+                [_CSV_NULL if value is None else value for value in row] for row in chunk
+            )
+            self._text = self._text[self._pos:] + self._buf.getvalue()
+            self._pos = 0
+        end = len(self._text) if size < 0 else min(self._pos + size, len(self._text))
+        data = self._text[self._pos:end]
+        self._pos = end
+        return data
+
+
+# Merges products_stage (see copy_upsert_products) into products. New rows seed
+# lowest/highest with current_price; history rows are skipped when the price
+# equals the product's last recorded one
+_MERGE_PRODUCTS_STAGE_SQL = """
+    WITH upserted AS (
+        INSERT INTO products (retailer_id, sku, name, link, brand, category, image, description,
+                              current_price, original_price, lowest_price, highest_price)
+        SELECT retailer_id, sku, name, link, brand, category, image, description,
+               current_price, original_price, current_price, current_price
+        FROM products_stage
+        ON CONFLICT (retailer_id, sku)
+        DO UPDATE SET
+            name = EXCLUDED.name,
+            link = EXCLUDED.link,
+            brand = EXCLUDED.brand,
+            category = EXCLUDED.category,
+            image = EXCLUDED.image,
+            description = EXCLUDED.description,
+            current_price = EXCLUDED.current_price,
+            original_price = EXCLUDED.original_price,
+            lowest_price = LEAST(products.lowest_price, EXCLUDED.current_price),
+            highest_price = GREATEST(products.highest_price, EXCLUDED.current_price),
+            last_updated_at = NOW()
+        -- Reloading a seed file leaves unchanged products (and their WAL) alone
+        WHERE (products.name, products.link, products.brand, products.category, products.image,
+               products.description, products.current_price, products.original_price)
+              IS DISTINCT FROM
+              (EXCLUDED.name, EXCLUDED.link, EXCLUDED.brand, EXCLUDED.category, EXCLUDED.image,
+               EXCLUDED.description, EXCLUDED.current_price, EXCLUDED.original_price)
+        RETURNING product_id, current_price
+    )
+    INSERT INTO price_history (product_id, price, currency)
+    SELECT u.product_id, u.current_price, 'THB' FROM upserted u
+    WHERE u.current_price IS NOT NULL AND u.current_price <> 0 AND NOT EXISTS (
+        SELECT 1 FROM (
+            SELECT price FROM price_history ph WHERE ph.product_id = u.product_id
+            ORDER BY scraped_at DESC LIMIT 1
+        ) last WHERE last.price = u.current_price
+    );
+    TRUNCATE products_stage;
+"""
+
+
+def copy_upsert_products(rows: list[tuple], conn=None,
+                         failed: list[tuple[tuple, Exception]] | None = None) -> int:
+    """
+    Insert or update many products by COPYing them into a temporary staging
+    table and merging it with one INSERT ... SELECT ... ON CONFLICT, which also
+    appends price_history rows as upsert_product does. Products identical to
+    the stored row are not rewritten. rows use the bulk_upsert_products
+    layout; rows repeating a (retailer_id, sku) are collapsed to the last one.
+
+    If the batch fails, it is retried row by row, each row under a savepoint,
+    so a bad row only loses itself; (row, error) pairs are appended to failed.
+    On conn (without committing) if given, otherwise on a pooled connection.
+    Returns the number of products upserted.
+    """
+    unique_rows = list({(row[0], str(row[1])): row for row in rows}.values())
+    if not unique_rows:
+        return 0
+
+    with nullcontext(conn) if conn is not None else get_db() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS products_stage (
+                    retailer_id VARCHAR(10), sku TEXT, name TEXT, link TEXT, brand TEXT,
+                    category TEXT, image TEXT, description TEXT,
+                    current_price DECIMAL(10, 2), original_price DECIMAL(10, 2)
+                ) ON COMMIT DROP
+            """)
+
+            cur.execute("SAVEPOINT copy_upsert")
+            try:
+                cur.copy_expert("""
+                    COPY products_stage (retailer_id, sku, name, link, brand, category, image,
+                                         description, current_price, original_price)
+                    FROM STDIN WITH (FORMAT csv)
+                """, CsvRowStream(unique_rows))
+                cur.execute(_MERGE_PRODUCTS_STAGE_SQL)
+                cur.execute("RELEASE SAVEPOINT copy_upsert")
+                return len(unique_rows)
+            except Exception:
+                cur.execute("ROLLBACK TO SAVEPOINT copy_upsert; RELEASE SAVEPOINT copy_upsert")
+
+            upserted = 0
+            for row in unique_rows:
+                cur.execute("SAVEPOINT copy_upsert")
+                try:
+                    cur.execute("INSERT INTO products_stage VALUES %s", (row,))
+                    cur.execute(_MERGE_PRODUCTS_STAGE_SQL)
+                except Exception as e:
+                    cur.execute("ROLLBACK TO SAVEPOINT copy_upsert; RELEASE SAVEPOINT copy_upsert")
+                    if failed is not None:
+                        failed.append((row, e))
+                    continue
+                cur.execute("RELEASE SAVEPOINT copy_upsert")
+                upserted += 1
+            return upserted
+
+
+def copy_new_products(rows: list[tuple]) -> int | None:
+    """
+    Load products for retailers that have none yet with COPY ... FROM STDIN,
+    which skips the per-row ON CONFLICT work of bulk_upsert_products, then
+    record their prices in price_history. rows use the bulk_upsert_products
+    layout; rows repeating a (retailer_id, sku) are collapsed to the last one.
+    Returns the number of products loaded, or None (writing nothing) if any of
+    the retailers already has products.
+    """
+    unique_rows = list({(row[0], row[1]): row for row in rows}.values())
+    if not unique_rows:
+        return 0
+    retailer_ids = sorted({row[0] for row in unique_rows})
+
+    with get_db() as conn:
+        with conn.cursor() as cur:
+            # Hold a per-retailer lock until commit so concurrent calls for the same
+            # retailer can't both pass the empty check below; sorted to avoid deadlocks
+            for retailer_id in retailer_ids:
+                cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (retailer_id,))
+            cur.execute("SELECT 1 FROM products WHERE retailer_id = ANY(%s) LIMIT 1", (retailer_ids,))
+            if cur.fetchone():
+                return None
+
+            # New rows seed lowest_price/highest_price with current_price
+            cur.copy_expert("""
+                COPY products (retailer_id, sku, name, link, brand, category, image, description,
+                               current_price, original_price, lowest_price, highest_price)
+                FROM STDIN WITH (FORMAT csv)
+            """, CsvRowStream(row + (row[8], row[8]) for row in unique_rows))
+
+            # Every product of these retailers is new, so each gets its first history row
+            cur.execute("""
+                INSERT INTO price_history (product_id, price, currency)
+                SELECT product_id, current_price, 'THB' FROM products
+                WHERE retailer_id = ANY(%s) AND current_price IS NOT NULL AND current_price <> 0
+            """, (retailer_ids,))
 
-            return product_id
+            return len(unique_rows)
 
 
 # Price functions
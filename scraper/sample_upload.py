@@ -2,10 +2,10 @@
 Sample data upload script for testing
 Run: python sample_upload.py
 """
-from database import get_or_create_retailer, upsert_product, add_product_match
+from database import bulk_upsert_products, get_or_create_retailer, add_product_match
 
 # Sample products for Thai Watsadu (base retailer)
-THAI_WATSADU_PRODUCTS = [
+THAI_WATSADU_PRODUCTS = (
     {
         "sku": "60272160",
         "name": "คีมล๊อคปากตรง SOLO รุ่น 2000 ขนาด 10 นิ้ว สีเงิน",
@@ -60,7 +60,7 @@ THAI_WATSADU_PRODUCTS = [
         "current_price": 3200,
         "original_price": 3500,
     },
-]
+)
 
 # Matching products from other retailers
 OTHER_RETAILER_PRODUCTS = {
@@ -92,42 +92,32 @@ OTHER_RETAILER_PRODUCTS = {
     ],
 }
 
-RETAILER_DOMAINS = {
-    "Thai Watsadu": "thaiwatsadu.com",
-    "HomePro": "homepro.co.th",
-    "Do Home": "dohome.co.th",
-    "Boonthavorn": "boonthavorn.com",
-    "Global House": "globalhouse.co.th",
-}
-
 
 def main():
     print("Uploading sample data...")
 
     # 1. Create Thai Watsadu products (base retailer)
     print("\n1. Creating Thai Watsadu products...")
-    tw_retailer_id = get_or_create_retailer("Thai Watsadu", RETAILER_DOMAINS["Thai Watsadu"])
+    tw_retailer_id = get_or_create_retailer("Thai Watsadu")
     print(f"   Thai Watsadu retailer_id: {tw_retailer_id}")
 
+    # Upsert all base products in one batch
+    product_ids = bulk_upsert_products([
+        (tw_retailer_id, p["sku"], p["name"], p["url"], p["brand"], p["category"],
+         None, None, p["current_price"], p["original_price"])
+        for p in THAI_WATSADU_PRODUCTS
+    ])
+
     base_products = {}  # sku -> product_id mapping
     for product in THAI_WATSADU_PRODUCTS:
-        product_id = upsert_product(
-            retailer_id=tw_retailer_id,
-            sku=product["sku"],
-            name=product["name"],
-            link=product["url"],
-            current_price=product["current_price"],
-            original_price=product["original_price"],
-            brand=product["brand"],
-            category=product["category"],
-        )
+        product_id = product_ids[(tw_retailer_id, product["sku"])]
         base_products[product["sku"]] = product_id
         print(f"   + {product['name'][:40]}... (ID: {product_id})")
 
     # # 2. Create products from other retailers and matches
     # print("\n2. Creating products from other retailers...")
     # for retailer_name, products in OTHER_RETAILER_PRODUCTS.items():
-    #     retailer_id = get_or_create_retailer(retailer_name, RETAILER_DOMAINS[retailer_name])
+    #     retailer_id = get_or_create_retailer(retailer_name)
     #     print(f"\n   {retailer_name} (retailer_id: {retailer_id}):")
 
     #     for product in products:
@@ -7,10 +7,14 @@ This script:
 2. Upserts products (insert new or update existing)
 3. Updates price history automatically
 """
-import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import logging
-from database import get_or_create_retailer, upsert_product
+
+from database import (
+    bulk_upsert_products, copy_new_products, get_or_create_retailer, load_products, product_rows,
+    upsert_product,
+)
 
 # Setup logging
 logging.basicConfig(
@@ -19,68 +23,110 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Retailer domain mapping
-RETAILERS = {
-    "Thai Watsadu": "thaiwatsadu.com",
-    "HomePro": "homepro.co.th",
-    "Do Home": "dohome.co.th",
-    "Boonthavorn": "boonthavorn.com",
-    "Global House": "globalhouse.co.th",
-}
+# Concurrent file imports in import_all_json_files (kept below the DB pool size)
+IMPORT_WORKERS = 8
 
 
-def import_products_from_json(json_file: Path) -> int:
+def read_product_rows(json_file: Path) -> list[tuple]:
     """
-    Import products from a JSON file.
-    Returns number of products imported.
+    Read a JSON file into bulk_upsert_products rows.
+    Returns an empty list if the file has no products.
     """
-    logger.info(f"Processing: {json_file.name}")
-
-    with open(json_file, "r", encoding="utf-8") as f:
-        products = json.load(f)
+    products = load_products(json_file)
 
     if not products:
         logger.warning(f"No products in {json_file.name}")
-        return 0
+        return []
 
     # Get retailer info from first product
     retailer_name = products[0].get("retailer", "Unknown")
-    retailer_domain = RETAILERS.get(retailer_name)
 
     # Get or create retailer
-    retailer_id = get_or_create_retailer(retailer_name, retailer_domain)
+    retailer_id = get_or_create_retailer(retailer_name)
     logger.info(f"Retailer: {retailer_name} (ID: {retailer_id})")
 
+    return product_rows(retailer_id, products)
+
+
+def upsert_product_rows(json_file: Path, rows: list[tuple]) -> int:
+    """
+    Upsert rows read from json_file in one batch, retrying product by product
+    if the batch fails. Returns number of products imported.
+    """
+    # Upsert the whole file at once (this also updates price_history)
+    try:
+        product_ids = bulk_upsert_products(rows)
+        logger.debug(f"Upserted {len(product_ids)} products from {json_file.name}")
+        return len(rows)
+    except Exception as e:
+        logger.warning(f"Batch import failed for {json_file.name}, retrying per product: {e}")
+
+    # Retry product by product so only the offending rows fail
     count = 0
-    for product in products:
+    for row in rows:
         try:
-            # Get first image if available
-            image = product.get("images", [None])[0] if product.get("images") else None
-
-            # Upsert product (this also updates price_history)
             product_id = upsert_product(
-                retailer_id=retailer_id,
-                sku=product.get("sku"),
-                name=product.get("name"),
-                link=product.get("url"),
-                current_price=product.get("current_price"),
-                original_price=product.get("original_price"),
-                brand=product.get("brand"),
-                category=product.get("category"),
-                image=image,
-                description=product.get("description"),
+                retailer_id=row[0],
+                sku=row[1],
+                name=row[2],
+                link=row[3],
+                brand=row[4],
+                category=row[5],
+                image=row[6],
+                description=row[7],
+                current_price=row[8],
+                original_price=row[9],
             )
-            logger.debug(f"Upserted product {product_id}: {product.get('name', '')[:50]}")
+            logger.debug("Upserted product %s: %.50s", product_id, row[2] or "")
             count += 1
 
         except Exception as e:
-            logger.error(f"Error importing product {product.get('sku')}: {e}")
+            logger.error(f"Error importing product {row[1]}: {e}")
 
     return count
 
 
-def import_all_json_files(directory: Path = None):
-    """Import all JSON files from a directory"""
+def import_products_from_json(json_file: Path) -> int:
+    """
+    Import products from a JSON file.
+    Returns number of products imported.
+    """
+    logger.info(f"Processing: {json_file.name}")
+    rows = read_product_rows(json_file)
+    if not rows:
+        return 0
+    return upsert_product_rows(json_file, rows)
+
+
+def import_products_from_json_copy(json_file: Path) -> int:
+    """
+    Cold-start variant of import_products_from_json: if the file's retailer has
+    no products yet they are loaded with COPY (see database.copy_new_products),
+    otherwise (or if the COPY fails) the rows are upserted as usual.
+    Returns number of products imported.
+    """
+    logger.info(f"Processing: {json_file.name}")
+    rows = read_product_rows(json_file)
+    if not rows:
+        return 0
+
+    try:
+        copied = copy_new_products(rows)
+        if copied is not None:
+            logger.debug(f"Copied {copied} products from {json_file.name}")
+            return copied
+    except Exception as e:
+        logger.warning(f"COPY failed for {json_file.name}, upserting instead: {e}")
+
+    return upsert_product_rows(json_file, rows)
+
+
+def import_all_json_files(directory: Path = None, copy: bool = False):
+    """
+    Import all JSON files from a directory.
+    With copy, retailers that have no products yet are seeded with COPY
+    (see import_products_from_json_copy).
+    """
     if directory is None:
         # Default to seeder folder for testing
         directory = Path(__file__).parent.parent / "seeder"
@@ -88,11 +134,21 @@ def import_all_json_files(directory: Path = None):
     json_files = list(directory.glob("*_products.json"))
     logger.info(f"Found {len(json_files)} JSON files to import")
 
+    # Files are independent, so import them concurrently (each worker checks
+    # out its own pooled connection). A file that fails is logged and skipped
+    # so the other files' imports still count.
+    import_file = import_products_from_json_copy if copy else import_products_from_json
     total = 0
-    for json_file in json_files:
-        count = import_products_from_json(json_file)
-        total += count
-        logger.info(f"Imported {count} products from {json_file.name}")
+    with ThreadPoolExecutor(max_workers=IMPORT_WORKERS) as ex:
+        futures = [ex.submit(import_file, json_file) for json_file in json_files]
+        for json_file, future in zip(json_files, futures):
+            try:
+                count = future.result()
+            except Exception as e:
+                logger.error(f"Error importing {json_file.name}: {e}")
+                continue
+            total += count
+            logger.info(f"Imported {count} products from {json_file.name}")
 
     logger.info(f"Total imported: {total} products")
     return total
@@ -114,8 +170,7 @@ def import_single_product(retailer_name: str, product_data: dict) -> int:
             "images": ["https://..."],
         })
     """
-    retailer_domain = RETAILERS.get(retailer_name)
-    retailer_id = get_or_create_retailer(retailer_name, retailer_domain)
+    retailer_id = get_or_create_retailer(retailer_name)
 
     image = product_data.get("images", [None])[0] if product_data.get("images") else None
 
@@ -4,70 +4,151 @@ Run: python seed_all_data.py
 
 This script imports ALL products from JSON files in the seeder folder.
 """
-import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from database import get_or_create_retailer, upsert_product
 
-# Retailer domain mapping
-RETAILER_DOMAINS = {
-    "Thai Watsadu": "thaiwatsadu.com",
-    "HomePro": "homepro.co.th",
-    "Do Home": "dohome.co.th",
-    "Boonthavorn": "boonthavorn.com",
-    "Global House": "globalhouse.co.th",
-}
+# Parsed product files are cached as .parquet siblings when pyarrow is installed
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+
+    # Cached product row columns (every copy_upsert_products column but retailer_id)
+    ROW_CACHE_SCHEMA = pa.schema([
+        ("sku", pa.string()), ("name", pa.string()), ("link", pa.string()),
+        ("brand", pa.string()), ("category", pa.string()), ("image", pa.string()),
+        ("description", pa.string()),
+        ("current_price", pa.float64()), ("original_price", pa.float64()),
+    ])
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+from database import (
+    copy_upsert_products, get_or_create_retailer, get_retailer_code, load_products, product_rows,
+    upsert_product,
+)
+
+
+# Seconds between progress lines of the per-product fallback in import_json_file
+PROGRESS_INTERVAL = 1.0
+
+
+def _parquet_sibling(file_path: Path) -> Path | None:
+    """The up-to-date .parquet copy of a product file, if any"""
+    parquet_path = file_path.with_suffix(".parquet")
+    if parquet_path.exists() and parquet_path.stat().st_mtime >= file_path.stat().st_mtime:
+        return parquet_path
+    return None
+
+
+def read_row_cache(parquet_path: Path) -> tuple[str, list[tuple]]:
+    """Read a read_json_file result back from its parquet cache"""
+    table = pq.read_table(parquet_path)
+    retailer_name = table.schema.metadata[b"retailer"].decode()
+    retailer_id = get_retailer_code(retailer_name)
+    return retailer_name, list(zip(repeat(retailer_id), *(column.to_pylist() for column in table.columns)))
+
+
+def write_row_cache(parquet_path: Path, retailer_name: str, rows: list[tuple]):
+    """Cache a read_json_file result as parquet (the retailer is kept as metadata)"""
+    columns = list(zip(*rows))[1:]
+    table = pa.Table.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, ROW_CACHE_SCHEMA)],
+        schema=ROW_CACHE_SCHEMA.with_metadata({"retailer": retailer_name}),
+    )
+    pq.write_table(table, parquet_path, compression="zstd")
+
+
+def read_json_file(json_file: Path) -> tuple[str | None, list[tuple]]:
+    """
+    Parse a JSON file into (retailer_name, copy_upsert_products rows).
+    With pyarrow installed, the rows come from the file's up-to-date .parquet
+    sibling when there is one, and otherwise a sibling is written for later runs.
+    Pure CPU work with no database access, so main runs it in worker processes.
+    """
+    if PYARROW_AVAILABLE:
+        parquet_path = _parquet_sibling(json_file)
+        if parquet_path:
+            return read_row_cache(parquet_path)
+
+    products = load_products(json_file)
+    if not products:
+        return None, []
+
+    # Get retailer info from first product
+    retailer_name = products[0].get("retailer", "Unknown")
+    retailer_id = get_retailer_code(retailer_name)
+    rows = product_rows(retailer_id, products)
+
+    if PYARROW_AVAILABLE:
+        try:
+            write_row_cache(json_file.with_suffix(".parquet"), retailer_name, rows)
+        except Exception as e:
+            print(f"  Could not cache {json_file.name} as parquet: {e}")
+    return retailer_name, rows
 
 
-def import_json_file(json_file: Path) -> int:
-    """Import all products from a JSON file. Returns count."""
+def import_json_file(json_file: Path, parsed: tuple[str | None, list[tuple]] = None) -> int:
+    """
+    Import all products from a JSON file. Returns count.
+    parsed is the file's read_json_file result, if already computed.
+    """
     print(f"\nProcessing: {json_file.name}")
 
-    with open(json_file, "r", encoding="utf-8") as f:
-        products = json.load(f)
+    retailer_name, rows = parsed if parsed is not None else read_json_file(json_file)
 
-    if not products:
+    if not rows:
         print("  No products found")
         return 0
 
-    # Get retailer info from first product
-    retailer_name = products[0].get("retailer", "Unknown")
-    retailer_domain = RETAILER_DOMAINS.get(retailer_name)
-
     # Get or create retailer
-    retailer_id = get_or_create_retailer(retailer_name, retailer_domain)
+    retailer_id = get_or_create_retailer(retailer_name)
     print(f"  Retailer: {retailer_name} (ID: {retailer_id})")
-    print(f"  Total products: {len(products)}")
+    print(f"  Total products: {len(rows)}")
+
+    # Load the whole file with one COPY + merge (rows that fail it are retried
+    # one by one and reported in failed)
+    failed = []
+    try:
+        count = copy_upsert_products(rows, failed=failed)
+        for row, e in failed[:5]:
+            print(f"    Error: {row[1]} - {e}")
+        print(f"  Imported: {count} products" + (f" ({len(failed)} errors)" if failed else ""))
+        return count
+    except Exception as e:
+        print(f"  Bulk load failed, retrying per product: {e}")
 
     count = 0
     errors = 0
-    for product in products:
+    last_report = time.monotonic()
+    for row in rows:
         try:
-            # Get first image if available
-            image = product.get("images", [None])[0] if product.get("images") else None
-
             # Upsert product
             product_id = upsert_product(
-                retailer_id=retailer_id,
-                sku=product.get("sku"),
-                name=product.get("name"),
-                link=product.get("url"),
-                current_price=product.get("current_price"),
-                original_price=product.get("original_price"),
-                brand=product.get("brand"),
-                category=product.get("category"),
-                image=image,
-                description=product.get("description"),
+                retailer_id=row[0],
+                sku=row[1],
+                name=row[2],
+                link=row[3],
+                brand=row[4],
+                category=row[5],
+                image=row[6],
+                description=row[7],
+                current_price=row[8],
+                original_price=row[9],
             )
             count += 1
 
-            # Progress indicator every 100 products
-            if count % 100 == 0:
+            # Progress indicator at most every PROGRESS_INTERVAL seconds
+            if time.monotonic() - last_report >= PROGRESS_INTERVAL:
                 print(f"    Imported {count} products...")
+                last_report = time.monotonic()
 
         except Exception as e:
             errors += 1
             if errors <= 5:
-                print(f"    Error: {product.get('sku')} - {e}")
+                print(f"    Error: {row[1]} - {e}")
             elif errors == 6:
                 print(f"    ... suppressing further errors")
 
@@ -86,10 +167,12 @@ def main():
 
     print(f"\nFound {len(json_files)} JSON files in {seeder_dir}")
 
+    # Files are parsed in worker processes while this process writes the ones
+    # already parsed, so parsing overlaps the database work
     total = 0
-    for json_file in json_files:
-        count = import_json_file(json_file)
-        total += count
+    with ProcessPoolExecutor() as ex:
+        for json_file, parsed in zip(json_files, ex.map(read_json_file, json_files)):
+            total += import_json_file(json_file, parsed)
 
     print("\n" + "=" * 60)
     print(f"DONE! Imported {total} total products from {len(json_files)} files")
@@ -0,0 +1,56 @@
+"""Tests for database.CsvRowStream"""
+import os
+import sys
+
+import pytest
+
+# Import database as the scraper scripts do, from the scraper folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("psycopg2")
+from database import CsvRowStream
+
+# More rows than CsvRowStream.CHUNK_ROWS, with fields CSV has to quote and NULLs
+ROWS = [
+    ("twd", f"sku{i}", f'name, "quoted" {i}\nsecond line', None, i * 1.5)
+    for i in range(2 * CsvRowStream.CHUNK_ROWS + 7)
+]
+
+
+# ROWS as COPY ... (FORMAT csv) should see them: strings quoted, None as nothing
+EXPECTED_CSV = "".join(
+    f'"twd","sku{i}","name, ""quoted"" {i}\nsecond line",,{i * 1.5}\r\n'
+    for i in range(len(ROWS))
+)
+
+
+def read_all(stream: CsvRowStream, size: int) -> list[str]:
+    chunks = []
+    while chunk := stream.read(size):
+        chunks.append(chunk)
+    return chunks
+
+
+@pytest.mark.parametrize("size", [1, 7, 8192, -1])
+def test_read_returns_the_csv_text_across_chunk_boundaries(size):
+    chunks = read_all(CsvRowStream(ROWS), size)
+    assert "".join(chunks) == EXPECTED_CSV
+    if size > 0:
+        # Every read but the last fills the requested size exactly
+        assert all(len(chunk) == size for chunk in chunks[:-1])
+        assert 0 < len(chunks[-1]) <= size
+
+
+@pytest.mark.parametrize("size", [1, 7, 8192, -1])
+def test_read_of_no_rows_is_empty(size):
+    assert CsvRowStream(iter(())).read(size) == ""
+
+
+def test_none_is_written_as_an_unquoted_empty_field():
+    # COPY ... (FORMAT csv) reads an unquoted empty field as NULL
+    assert CsvRowStream([("twd", None, 1, 2.5)]).read() == '"twd",,1,2.5\r\n'
+
+
+def test_empty_string_is_quoted():
+    # ...and a quoted one as '', so an empty brand or description isn't loaded as NULL
+    assert CsvRowStream([("twd", "", None)]).read() == '"twd","",\r\n'
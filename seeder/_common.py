@@ -0,0 +1,236 @@
+"""
+Database access, retailer mappings and product seeding helpers shared by the
+seeder scripts (seed_products.py, seed_products_matched.py, seed_users.py,
+upload_matches.py). Not a script itself: run one of those.
+"""
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import urlparse
+
+from psycopg2.extras import RealDictCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool
+from dotenv import load_dotenv
+
+# The product row, JSON and COPY helpers are the scraper's: the seeder scripts
+# import them from scraper/database.py, which this puts on sys.path
+sys.path.insert(0, str(Path(__file__).parent.parent / "scraper"))
+
+from database import pooled_connection
+
+# pandas reads the match spreadsheets (see read_match_file); only the
+# match-based scripts need it
+try:
+    import pandas as pd
+    PANDAS_AVAILABLE = True
+except ImportError:
+    PANDAS_AVAILABLE = False
+
+# Load .env from this folder
+load_dotenv(Path(__file__).parent / ".env")
+
+# Database configuration
+DATABASE_URL = os.environ.get("DATABASE_URL")
+
+if DATABASE_URL:
+    parsed = urlparse(DATABASE_URL)
+    DB_CONFIG = {
+        "host": parsed.hostname,
+        "port": parsed.port or 5432,
+        "database": parsed.path[1:],
+        "user": parsed.username,
+        "password": parsed.password,
+        "sslmode": "require",
+    }
+else:
+    db_host = os.environ.get("DB_HOST", "localhost")
+    DB_CONFIG = {
+        "host": db_host,
+        "port": int(os.environ.get("DB_PORT", 5432)),
+        "database": os.environ.get("DB_NAME", "pricehawk"),
+        "user": os.environ.get("DB_USER", "pricehawk"),
+        "password": os.environ.get("DB_PASSWORD", "pricehawk_secret"),
+    }
+    if db_host != "localhost":
+        DB_CONFIG["sslmode"] = "require"
+
+
+# Session settings for seeding: commits don't wait for the WAL flush (a crash
+# can only lose the last few commits of a rerunnable seed), no JIT compiling of
+# short statements, and more memory for sorts and index builds. Sent as startup
+# options, so every pooled connection has them from connect on
+SEED_SESSION_SETTINGS = (
+    "-c synchronous_commit=off -c jit=off -c work_mem=64MB"
+    " -c maintenance_work_mem=256MB -c client_min_messages=warning"
+)
+
+
+# Product files loaded at once by the product seeders, each on its own pooled connection
+LOAD_WORKERS = 4
+
+# Shared connection pool, created on first use (see _get_pool); one connection
+# per load worker plus the seeder's main one
+POOL_MAX_CONNECTIONS = LOAD_WORKERS + 1
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadedConnectionPool:
+    """Get the module-level connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadedConnectionPool(1, POOL_MAX_CONNECTIONS, **DB_CONFIG,
+                                               application_name="pricehawk-seeder",
+                                               options=SEED_SESSION_SETTINGS,
+                                               cursor_factory=RealDictCursor)
+    return _pool
+
+
+def get_db():
+    """Get database connection (checked out of the shared pool)"""
+    return pooled_connection(_get_pool())
+
+
+# Retailer mappings
+RETAILER_CODES = {
+    "Thai Watsadu": "twd",
+    "HomePro": "hp",
+    "MegaHome": "mgh",
+    "Do Home": "dh",
+    "Boonthavorn": "btv",
+    "Global House": "gbh",
+}
+
+RETAILER_DOMAINS = {
+    "Thai Watsadu": "thaiwatsadu.com",
+    "HomePro": "homepro.co.th",
+    "MegaHome": "megahome.co.th",
+    "Do Home": "dohome.co.th",
+    "Boonthavorn": "boonthavorn.com",
+    "Global House": "globalhouse.co.th",
+}
+
+# Map filename keywords to retailer codes
+COMPETITOR_MAPPING = {
+    "homepro": "hp",
+    "megahome": "mgh",
+    "dohome": "dh",
+    "boonthavorn": "btv",
+    "globalhouse": "gbh",
+}
+
+# SKU columns of the twd_*.xlsx match files. They are always read as text: numeric
+# SKUs would otherwise become floats ("123.0") wherever a column has empty cells
+MATCH_SKU_COLUMNS = ("TWD_SKU", "COMPETITOR_SKU")
+
+
+def parquet_sibling(file_path: Path) -> Path | None:
+    """The up-to-date .parquet copy of a match spreadsheet, if any"""
+    parquet_path = file_path.with_suffix(".parquet")
+    if parquet_path.exists() and parquet_path.stat().st_mtime >= file_path.stat().st_mtime:
+        return parquet_path
+    return None
+
+
+def read_match_sheet(file_path: Path, text_columns: tuple[str, ...] = ()) -> "pd.DataFrame":
+    """
+    Parse a whole match .xlsx with the Rust-backed calamine engine, reading the
+    SKU columns and `text_columns` as strings.
+    """
+    dtype = dict.fromkeys(MATCH_SKU_COLUMNS + tuple(text_columns), str)
+    return pd.read_excel(file_path, dtype=dtype, engine="calamine")
+
+
+def write_match_cache(file_path: Path, df: "pd.DataFrame") -> Path:
+    """Write df (see read_match_sheet) as the .parquet sibling of file_path"""
+    parquet_path = file_path.with_suffix(".parquet")
+    df.to_parquet(parquet_path, index=False)
+    return parquet_path
+
+
+def read_match_file(file_path: Path, columns: list[str] | None = None,
+                    text_columns: tuple[str, ...] = (), cache: bool = False) -> "pd.DataFrame":
+    """
+    Read the `columns` of a match spreadsheet that it has (all if None), with
+    `text_columns` as strings.
+
+    Prefers an up-to-date .parquet sibling. Otherwise the .xlsx is parsed with
+    calamine; with cache, the whole sheet is parsed and written as the .parquet
+    sibling for later runs.
+    """
+    parquet_path = parquet_sibling(file_path)
+    if parquet_path:
+        if columns is not None:
+            import pyarrow.parquet as pq
+            names = pq.read_schema(parquet_path).names
+            columns = [col for col in columns if col in names]
+        df = pd.read_parquet(parquet_path, columns=columns)
+    elif cache:
+        # The cache keeps every column, so later runs can ask for any of them
+        df = read_match_sheet(file_path, text_columns)
+        try:
+            write_match_cache(file_path, df)
+        except Exception as e:
+            print(f"  Could not cache {file_path.name} as parquet: {e}")
+        if columns is not None:
+            df = df[[col for col in columns if col in df.columns]]
+    else:
+        # A callable usecols skips absent columns instead of raising
+        usecols = None if columns is None else set(columns).__contains__
+        return pd.read_excel(file_path, usecols=usecols, engine="calamine",
+                             dtype={col: str for col in text_columns})
+    return df.astype({col: "string" for col in text_columns if col in df.columns})
+
+
+def seed_retailers(conn):
+    """Insert (or rename) every known retailer with one statement and commit"""
+    with conn.cursor() as cur:
+        execute_values(
+            cur,
+            """
+            INSERT INTO retailers (retailer_id, name, domain)
+            VALUES %s
+            ON CONFLICT (retailer_id) DO UPDATE SET name = EXCLUDED.name
+            """,
+            [(code, name, RETAILER_DOMAINS.get(name)) for name, code in RETAILER_CODES.items()]
+        )
+    conn.commit()
+
+
+# Secondary indexes (as created by database/init/01_schema.sql) that an initial
+# seed builds once at the end instead of updating row by row. The unique
+# (retailer_id, sku) index is kept, since ON CONFLICT needs it
+SECONDARY_INDEXES = {
+    "idx_products_retailer": "CREATE INDEX IF NOT EXISTS idx_products_retailer ON products(retailer_id)",
+    "idx_products_sku": "CREATE INDEX IF NOT EXISTS idx_products_sku ON products(sku)",
+    "idx_price_history_product_date":
+        "CREATE INDEX IF NOT EXISTS idx_price_history_product_date ON price_history(product_id, scraped_at DESC)",
+    "idx_price_history_date": "CREATE INDEX IF NOT EXISTS idx_price_history_date ON price_history(scraped_at)",
+}
+
+
+@contextmanager
+def deferred_indexes(conn):
+    """
+    When products is empty, drop SECONDARY_INDEXES for the duration of the
+    load. Afterwards (re)create any missing ones and ANALYZE the loaded tables.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT EXISTS (SELECT 1 FROM products) AS seeded")
+        if not cur.fetchone()["seeded"]:
+            cur.execute("DROP INDEX IF EXISTS " + ", ".join(SECONDARY_INDEXES))
+    conn.commit()
+    try:
+        yield
+    finally:
+        conn.rollback()
+        with conn.cursor() as cur:
+            # IF NOT EXISTS also restores indexes left dropped by an interrupted seed
+            for statement in SECONDARY_INDEXES.values():
+                cur.execute(statement)
+            cur.execute("ANALYZE products, price_history")
+        conn.commit()
@@ -2,147 +2,146 @@
 Seed script for products from JSON files
 Run: python seeder/seed_products.py
 """
-import os
-import json
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from contextlib import contextmanager
-from urllib.parse import urlparse
-from dotenv import load_dotenv
-
-# Load .env from this folder
-load_dotenv(Path(__file__).parent / ".env")
-
-# Database configuration
-DATABASE_URL = os.environ.get("DATABASE_URL")
-
-if DATABASE_URL:
-    parsed = urlparse(DATABASE_URL)
-    DB_CONFIG = {
-        "host": parsed.hostname,
-        "port": parsed.port or 5432,
-        "database": parsed.path[1:],
-        "user": parsed.username,
-        "password": parsed.password,
-        "sslmode": "require",
-    }
-else:
-    DB_CONFIG = {
-        "host": os.environ.get("DB_HOST", "localhost"),
-        "port": int(os.environ.get("DB_PORT", 5432)),
-        "database": os.environ.get("DB_NAME", "pricehawk"),
-        "user": os.environ.get("DB_USER", "pricehawk"),
-        "password": os.environ.get("DB_PASSWORD", "pricehawk_secret"),
-    }
-
-
-@contextmanager
-def get_db():
-    conn = psycopg2.connect(**DB_CONFIG, cursor_factory=RealDictCursor)
+
+from psycopg2.extras import execute_values
+
+from _common import DB_CONFIG, LOAD_WORKERS, RETAILER_CODES, get_db, seed_retailers, deferred_indexes
+from database import load_products, product_rows
+
+# Rows per execute_values statement in bulk_seed_products
+BATCH_SIZE = 1000
+
+
+# Row errors listed per file by bulk_seed_products' per-row fallback before the rest are counted
+MAX_REPORTED_ERRORS = 5
+
+
+def _insert_rows(cur, rows: list[tuple]):
+    """Upsert bulk_seed_products rows and add their initial price history"""
+    returned = execute_values(
+        cur,
+        """
+        INSERT INTO products (
+            retailer_id, sku, name, link, brand, category, image, description,
+            current_price, original_price, lowest_price, highest_price
+        )
+        VALUES %s
+        ON CONFLICT (retailer_id, sku) DO UPDATE SET
+            name = EXCLUDED.name,
+            link = EXCLUDED.link,
+            brand = EXCLUDED.brand,
+            category = EXCLUDED.category,
+            image = EXCLUDED.image,
+            description = EXCLUDED.description,
+            current_price = EXCLUDED.current_price,
+            original_price = EXCLUDED.original_price,
+            last_updated_at = NOW()
+        -- Rerunning a seed leaves unchanged products (and their WAL) alone
+        WHERE (products.name, products.link, products.brand, products.category, products.image,
+               products.description, products.current_price, products.original_price)
+              IS DISTINCT FROM
+              (EXCLUDED.name, EXCLUDED.link, EXCLUDED.brand, EXCLUDED.category, EXCLUDED.image,
+               EXCLUDED.description, EXCLUDED.current_price, EXCLUDED.original_price)
+        RETURNING product_id, sku
+        """,
+        rows, page_size=BATCH_SIZE, fetch=True
+    )
+    product_ids = {r["sku"]: r["product_id"] for r in returned}
+
+    # Add initial price to history (unchanged products are not returned)
+    history = [(product_ids[str(row[1])], row[8]) for row in rows
+               if row[8] and str(row[1]) in product_ids]
+    if history:
+        execute_values(
+            cur,
+            "INSERT INTO price_history (product_id, price, currency) VALUES %s",
+            history, template="(%s, %s, 'THB')", page_size=BATCH_SIZE
+        )
+
+
+def bulk_seed_products(conn, retailer_id: str, products: list[dict], report: list[str]) -> int:
+    """
+    Insert products and their initial price history with execute_values.
+    Products repeating a SKU are collapsed to the last one, since a single
+    INSERT ... ON CONFLICT cannot update the same row twice.
+    Products identical to the stored row are left untouched and get no new
+    price history.
+    If the batch fails, it is rolled back and retried row by row, each under a
+    savepoint, so one bad product only loses itself; failures go to report.
+    Does not commit: the caller commits once per file.
+    Returns the number of products seeded.
+    """
+    rows = list({
+        str(row[1]): row + (row[8], row[8]) for row in product_rows(retailer_id, products)
+    }.values())
+    if not rows:
+        return 0
+
     try:
-        yield conn
-        conn.commit()
-    except Exception:
+        with conn.cursor() as cur:
+            _insert_rows(cur, rows)
+        return len(rows)
+    except Exception as e:
         conn.rollback()
-        raise
-    finally:
-        conn.close()
-
-
-# Retailer code mapping
-RETAILER_CODES = {
-    "Thai Watsadu": "twd",
-    "HomePro": "hp",
-    "MegaHome": "mgh",
-    "Do Home": "dh",
-    "Boonthavorn": "btv",
-    "Global House": "gbh",
-}
-
-RETAILER_DOMAINS = {
-    "Thai Watsadu": "thaiwatsadu.com",
-    "HomePro": "homepro.co.th",
-    "MegaHome": "megahome.co.th",
-    "Do Home": "dohome.co.th",
-    "Boonthavorn": "boonthavorn.com",
-    "Global House": "globalhouse.co.th",
-}
-
-
-def seed_retailer(conn, name: str) -> str:
-    """Insert retailer and return retailer_id"""
-    code = RETAILER_CODES.get(name)
-    if not code:
-        raise ValueError(f"Unknown retailer: {name}")
-
-    domain = RETAILER_DOMAINS.get(name)
+        report.append(f"  Bulk insert failed, retrying per product: {e}")
 
+    seeded = 0
+    errors = 0
     with conn.cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO retailers (retailer_id, name, domain)
-            VALUES (%s, %s, %s)
-            ON CONFLICT (retailer_id) DO UPDATE SET name = EXCLUDED.name
-            RETURNING retailer_id
-            """,
-            (code, name, domain)
-        )
-        conn.commit()
-        return cur.fetchone()["retailer_id"]
+        for row in rows:
+            cur.execute("SAVEPOINT seed_row")
+            try:
+                _insert_rows(cur, [row])
+            except Exception as e:
+                cur.execute("ROLLBACK TO SAVEPOINT seed_row; RELEASE SAVEPOINT seed_row")
+                errors += 1
+                if errors <= MAX_REPORTED_ERRORS:
+                    report.append(f"    ! Error: {row[1]} - {e}")
+                continue
+            cur.execute("RELEASE SAVEPOINT seed_row")
+            seeded += 1
+    if errors > MAX_REPORTED_ERRORS:
+        report.append(f"    ... and {errors - MAX_REPORTED_ERRORS} more errors")
+    if errors:
+        report.append(f"  Failed: {errors} products")
+    return seeded
 
 
-def seed_product(conn, retailer_id: str, product: dict) -> int:
-    """Insert product and return product_id"""
-    with conn.cursor() as cur:
-        image = product.get("images", [None])[0] if product.get("images") else None
-
-        cur.execute(
-            """
-            INSERT INTO products (
-                retailer_id, sku, name, brand, category, link, image, description,
-                current_price, original_price, lowest_price, highest_price
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (retailer_id, sku) DO UPDATE SET
-                name = EXCLUDED.name,
-                brand = EXCLUDED.brand,
-                category = EXCLUDED.category,
-                link = EXCLUDED.link,
-                image = EXCLUDED.image,
-                description = EXCLUDED.description,
-                current_price = EXCLUDED.current_price,
-                original_price = EXCLUDED.original_price,
-                last_updated_at = NOW()
-            RETURNING product_id
-            """,
-            (
-                retailer_id,
-                product.get("sku"),
-                product.get("name"),
-                product.get("brand"),
-                product.get("category"),
-                product.get("url"),
-                image,
-                product.get("description"),
-                product.get("current_price"),
-                product.get("original_price"),
-                product.get("current_price"),
-                product.get("current_price"),
-            )
-        )
-        conn.commit()
-        return cur.fetchone()["product_id"]
+def seed_file(json_file: Path) -> tuple[list[str], int]:
+    """
+    Seed one product JSON file on its own pooled connection, committing once.
+    Runs in main's worker threads, so its report lines are returned for main
+    to print in file order.
+    Returns (report_lines, products_seeded)
+    """
+    report = [f"\nProcessing: {json_file.name}"]
 
+    products = load_products(json_file)
 
-def seed_price_history(conn, product_id: int, price: float):
-    """Add initial price to history"""
-    with conn.cursor() as cur:
-        cur.execute(
-            "INSERT INTO price_history (product_id, price, currency) VALUES (%s, %s, 'THB')",
-            (product_id, price)
-        )
-        conn.commit()
+    if not products:
+        report.append("  No products found")
+        return report, 0
+
+    retailer_name = products[0].get("retailer", "Unknown")
+
+    if retailer_name not in RETAILER_CODES:
+        report.append(f"  Unknown retailer: {retailer_name}, skipping...")
+        return report, 0
+
+    retailer_id = RETAILER_CODES[retailer_name]
+    report.append(f"  Retailer: {retailer_name} (ID: {retailer_id})")
+
+    try:
+        with get_db() as conn:
+            seeded = bulk_seed_products(conn, retailer_id, products, report)
+    except Exception as e:
+        report.append(f"    ! Error: {e}")
+        return report, 0
+
+    report.append(f"  Seeded {seeded} products")
+    return report, seeded
 
 
 def main():
@@ -157,39 +156,16 @@ def main():
 
     total_products = 0
 
-    with get_db() as conn:
-        for json_file in json_files:
-            print(f"\nProcessing: {json_file.name}")
-
-            with open(json_file, "r", encoding="utf-8") as f:
-                products = json.load(f)
-
-            if not products:
-                print("  No products found")
-                continue
-
-            retailer_name = products[0].get("retailer", "Unknown")
-
-            if retailer_name not in RETAILER_CODES:
-                print(f"  Unknown retailer: {retailer_name}, skipping...")
-                continue
-
-            retailer_id = seed_retailer(conn, retailer_name)
-            print(f"  Retailer: {retailer_name} (ID: {retailer_id})")
-
-            # Seed top 10 products
-            top_10 = products[:]
-            for product in top_10:
-                try:
-                    product_id = seed_product(conn, retailer_id, product)
-
-                    if product.get("current_price"):
-                        seed_price_history(conn, product_id, product["current_price"])
+    with get_db() as conn, deferred_indexes(conn):
+        # Retailer codes are fixed, so all retailers are seeded once up front
+        seed_retailers(conn)
 
-                    print(f"    + {product.get('name', 'Unknown')[:50]}...")
-                    total_products += 1
-                except Exception as e:
-                    print(f"    ! Error: {e}")
+        # Each file is a different retailer's (retailer_id, sku) range, so the
+        # files load concurrently without contending for the same rows
+        with ThreadPoolExecutor(max_workers=LOAD_WORKERS) as ex:
+            for report, seeded in ex.map(seed_file, json_files):
+                print("\n".join(report))
+                total_products += seeded
 
     print(f"\nSeeded {total_products} products")
 
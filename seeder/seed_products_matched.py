@@ -7,96 +7,26 @@ This script:
 2. Reads *_products.json files
 3. Inserts only products whose SKU appears in match results
 """
-import os
-import json
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
 from pathlib import Path
-from contextlib import contextmanager
-from urllib.parse import urlparse
-from dotenv import load_dotenv
-
-try:
-    import pandas as pd
-except ImportError:
-    print("Error: pandas is required. Install with: pip install pandas openpyxl")
-    exit(1)
 
-# Load .env from this folder
-load_dotenv(Path(__file__).parent / ".env")
-
-# Database configuration
-DATABASE_URL = os.environ.get("DATABASE_URL")
-
-if DATABASE_URL:
-    parsed = urlparse(DATABASE_URL)
-    DB_CONFIG = {
-        "host": parsed.hostname,
-        "port": parsed.port or 5432,
-        "database": parsed.path[1:],
-        "user": parsed.username,
-        "password": parsed.password,
-        "sslmode": "require",
-    }
-else:
-    db_host = os.environ.get("DB_HOST", "localhost")
-    DB_CONFIG = {
-        "host": db_host,
-        "port": int(os.environ.get("DB_PORT", 5432)),
-        "database": os.environ.get("DB_NAME", "pricehawk"),
-        "user": os.environ.get("DB_USER", "pricehawk"),
-        "password": os.environ.get("DB_PASSWORD", "pricehawk_secret"),
-    }
-    if db_host != "localhost":
-        DB_CONFIG["sslmode"] = "require"
-
-
-@contextmanager
-def get_db():
-    conn = psycopg2.connect(**DB_CONFIG, cursor_factory=RealDictCursor)
-    try:
-        yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
-
-
-# Retailer mappings
-RETAILER_CODES = {
-    "Thai Watsadu": "twd",
-    "HomePro": "hp",
-    "MegaHome": "mgh",
-    "Do Home": "dh",
-    "Boonthavorn": "btv",
-    "Global House": "gbh",
-}
-
-RETAILER_DOMAINS = {
-    "Thai Watsadu": "thaiwatsadu.com",
-    "HomePro": "homepro.co.th",
-    "MegaHome": "megahome.co.th",
-    "Do Home": "dohome.co.th",
-    "Boonthavorn": "boonthavorn.com",
-    "Global House": "globalhouse.co.th",
-}
-
-# Map filename keywords to retailer codes
-COMPETITOR_MAPPING = {
-    "homepro": "hp",
-    "megahome": "mgh",
-    "dohome": "dh",
-    "boonthavorn": "btv",
-    "globalhouse": "gbh",
-}
+from _common import (
+    DB_CONFIG, LOAD_WORKERS, PANDAS_AVAILABLE, RETAILER_CODES, COMPETITOR_MAPPING,
+    get_db, seed_retailers, deferred_indexes, read_match_file,
+)
+from database import copy_upsert_products, load_products, product_rows
+
+if not PANDAS_AVAILABLE:
+    print("Error: pandas is required. Install with: pip install pandas python-calamine")
+    exit(1)
 
 
 def extract_skus_from_excel(seeder_dir: Path, twd_col: str = "TWD_SKU", comp_col: str = "COMPETITOR_SKU") -> dict:
     """
     Read all twd_*.xlsx files and extract SKUs.
-    Returns dict: {retailer_id: set of SKUs}
+    Returns dict: {retailer_id: frozenset of SKUs}
     """
     excel_files = list(seeder_dir.glob("twd_*.xlsx"))
 
@@ -128,7 +58,9 @@ def extract_skus_from_excel(seeder_dir: Path, twd_col: str = "TWD_SKU", comp_col
 
         # Read Excel
         try:
-            df = pd.read_excel(excel_file)
+            # Only the SKU columns are needed, not the names, links and scores
+            df = read_match_file(excel_file, [twd_col, comp_col], text_columns=(twd_col, comp_col),
+                                 cache=True)
         except Exception as e:
             print(f"  Error reading {excel_file.name}: {e}")
             continue
@@ -150,82 +82,44 @@ def extract_skus_from_excel(seeder_dir: Path, twd_col: str = "TWD_SKU", comp_col
     for rid, skus in skus_by_retailer.items():
         print(f"  {rid}: {len(skus)} unique SKUs")
 
-    return skus_by_retailer
-
-
-def seed_retailer(conn, name: str) -> str:
-    """Insert retailer and return retailer_id"""
-    code = RETAILER_CODES.get(name)
-    if not code:
-        raise ValueError(f"Unknown retailer: {name}")
-
-    domain = RETAILER_DOMAINS.get(name)
-
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO retailers (retailer_id, name, domain)
-            VALUES (%s, %s, %s)
-            ON CONFLICT (retailer_id) DO UPDATE SET name = EXCLUDED.name
-            RETURNING retailer_id
-            """,
-            (code, name, domain)
-        )
-        conn.commit()
-        return cur.fetchone()["retailer_id"]
-
-
-def seed_product(conn, retailer_id: str, product: dict) -> int:
-    """Insert product and return product_id"""
-    with conn.cursor() as cur:
-        image = product.get("images", [None])[0] if product.get("images") else None
-
-        cur.execute(
-            """
-            INSERT INTO products (
-                retailer_id, sku, name, brand, category, link, image, description,
-                current_price, original_price, lowest_price, highest_price
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (retailer_id, sku) DO UPDATE SET
-                name = EXCLUDED.name,
-                brand = EXCLUDED.brand,
-                category = EXCLUDED.category,
-                link = EXCLUDED.link,
-                image = EXCLUDED.image,
-                description = EXCLUDED.description,
-                current_price = EXCLUDED.current_price,
-                original_price = EXCLUDED.original_price,
-                last_updated_at = NOW()
-            RETURNING product_id
-            """,
-            (
-                retailer_id,
-                product.get("sku"),
-                product.get("name"),
-                product.get("brand"),
-                product.get("category"),
-                product.get("url"),
-                image,
-                product.get("description"),
-                product.get("current_price"),
-                product.get("original_price"),
-                product.get("current_price"),
-                product.get("current_price"),
-            )
-        )
-        conn.commit()
-        return cur.fetchone()["product_id"]
-
-
-def seed_price_history(conn, product_id: int, price: float):
-    """Add initial price to history"""
-    with conn.cursor() as cur:
-        cur.execute(
-            "INSERT INTO price_history (product_id, price, currency) VALUES (%s, %s, 'THB')",
-            (product_id, price)
-        )
-        conn.commit()
+    return {rid: frozenset(skus) for rid, skus in skus_by_retailer.items()}
+
+
+# Failed products listed per file before the rest are counted
+MAX_REPORTED_ERRORS = 5
+
+
+def seed_matched_file(retailer_id: str, matched: list[dict]) -> tuple[int, list[tuple[tuple, Exception]]]:
+    """
+    Insert one file's matched products (see copy_upsert_products) on its own
+    pooled connection and commit. Runs in main's writer threads.
+    Returns (products_inserted, [(row, error) for each product that failed])
+    """
+    failed = []
+    with get_db() as conn:
+        inserted = copy_upsert_products(product_rows(retailer_id, matched), conn, failed)
+    return inserted, failed
+
+
+def filter_matched_products(json_file: Path, skus_by_retailer: dict) -> tuple[str | None, int, list[dict]]:
+    """
+    Parse a product JSON file and keep the products whose SKU appears in the
+    match results for its retailer. No database access, so main runs it in
+    worker processes.
+    Returns (retailer_name, total_products, matched_products)
+    """
+    products = load_products(json_file)
+    if not products:
+        return None, 0, []
+
+    retailer_name = products[0].get("retailer", "Unknown")
+    retailer_skus = skus_by_retailer.get(RETAILER_CODES.get(retailer_name))
+    if not retailer_skus:
+        return retailer_name, len(products), []
+
+    matched = [product for product in products
+               if str(product.get("sku", "")).strip() in retailer_skus]
+    return retailer_name, len(products), matched
 
 
 def main():
@@ -269,19 +163,30 @@ def main():
     total_products = 0
     total_skipped = 0
 
-    with get_db() as conn:
-        for json_file in json_files:
-            print(f"\nProcessing: {json_file.name}")
+    # Files are parsed and filtered in worker processes while writer threads
+    # insert the ones already done, so parsing overlaps the database work
+    filter_file = partial(filter_matched_products, skus_by_retailer=skus_by_retailer)
 
-            with open(json_file, "r", encoding="utf-8") as f:
-                products = json.load(f)
+    # (retailer_name, skipped, future of seed_matched_file) per file being inserted
+    pending = []
+
+    with (
+        get_db() as conn,
+        ProcessPoolExecutor() as ex,
+        nullcontext() if args.dry_run else deferred_indexes(conn),
+        ThreadPoolExecutor(max_workers=LOAD_WORKERS) as writers,
+    ):
+        # Retailer codes are fixed, so all retailers are seeded once up front
+        if not args.dry_run:
+            seed_retailers(conn)
+
+        for json_file, (retailer_name, product_count, matched) in zip(json_files, ex.map(filter_file, json_files)):
+            print(f"\nProcessing: {json_file.name}")
 
-            if not products:
+            if not product_count:
                 print("  No products found")
                 continue
 
-            retailer_name = products[0].get("retailer", "Unknown")
-
             if retailer_name not in RETAILER_CODES:
                 print(f"  Unknown retailer: {retailer_name}, skipping...")
                 continue
@@ -295,36 +200,39 @@ def main():
                 print(f"  No matched SKUs for {retailer_name}, skipping...")
                 continue
 
-            # Seed retailer
-            seed_retailer(conn, retailer_name)
             print(f"  Retailer: {retailer_name} (ID: {retailer_id})")
-            print(f"  Filtering {len(products)} products -> {len(retailer_skus)} matched SKUs")
-
-            inserted = 0
-            skipped = 0
-
-            for product in products:
-                sku = str(product.get("sku", "")).strip()
+            print(f"  Filtering {product_count} products -> {len(retailer_skus)} matched SKUs")
 
-                if sku not in retailer_skus:
-                    skipped += 1
-                    continue
+            skipped = product_count - len(matched)
 
-                if args.dry_run:
-                    print(f"    [DRY RUN] Would insert: {sku}")
-                    inserted += 1
-                else:
-                    try:
-                        product_id = seed_product(conn, retailer_id, product)
-
-                        if product.get("current_price"):
-                            seed_price_history(conn, product_id, product["current_price"])
+            if not args.dry_run:
+                # Each file is a different retailer's (retailer_id, sku) range, so
+                # the files are inserted concurrently, each on its own connection
+                pending.append((retailer_name, skipped, writers.submit(seed_matched_file, retailer_id, matched)))
+                continue
 
-                        inserted += 1
-                    except Exception as e:
-                        print(f"    ! Error inserting {sku}: {e}")
+            if matched:
+                # One write for the whole file rather than one per product
+                print("\n".join(f"    [DRY RUN] Would insert: {str(product.get('sku', '')).strip()}"
+                                for product in matched))
+            print(f"  Inserted: {len(matched)}, Skipped: {skipped}")
+            total_products += len(matched)
+            total_skipped += skipped
 
-            print(f"  Inserted: {inserted}, Skipped: {skipped}")
+        if pending:
+            print()
+        for retailer_name, skipped, future in pending:
+            try:
+                inserted, failed = future.result()
+            except Exception as e:
+                inserted, failed = 0, []
+                print(f"    ! Error inserting {retailer_name} products: {e}")
+            for row, e in failed[:MAX_REPORTED_ERRORS]:
+                print(f"    ! Error: {row[1]} - {e}")
+            if len(failed) > MAX_REPORTED_ERRORS:
+                print(f"    ... and {len(failed) - MAX_REPORTED_ERRORS} more errors")
+
+            print(f"  {retailer_name} - Inserted: {inserted}, Failed: {len(failed)}, Skipped: {skipped}")
             total_products += inserted
             total_skipped += skipped
 
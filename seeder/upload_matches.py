@@ -5,242 +5,628 @@ Run: python seeder/upload_matches.py
 Excel files should contain matching data with Thai Watsadu products
 as base products and competitor products as candidates.
 """
-import os
+import csv
+import io
+import re
 import sys
+import weakref
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from itertools import islice, repeat
 from pathlib import Path
 from contextlib import contextmanager
-from urllib.parse import urlparse
 
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from dotenv import load_dotenv
+from psycopg2.pool import ThreadedConnectionPool
 
+from _common import (
+    COMPETITOR_MAPPING, DB_CONFIG, parquet_sibling, read_match_file, read_match_sheet,
+    write_match_cache,
+)
+
+# Optional: psycopg (v3) + psycopg_pool for --use-psycopg3 (pipelined upserts)
 try:
+    from psycopg_pool import ConnectionPool
+    PSYCOPG3_AVAILABLE = True
+except ImportError:
+    PSYCOPG3_AVAILABLE = False
+
+try:
+    import numpy as np
     import pandas as pd
 except ImportError:
-    print("Error: pandas is required. Install with: pip install pandas openpyxl")
+    print("Error: pandas is required. Install with: pip install pandas python-calamine openpyxl pyarrow")
     sys.exit(1)
 
-# Load .env from this folder
-load_dotenv(Path(__file__).parent / ".env")
-
-# Database configuration
-DATABASE_URL = os.environ.get("DATABASE_URL")
-
-if DATABASE_URL:
-    parsed = urlparse(DATABASE_URL)
-    DB_CONFIG = {
-        "host": parsed.hostname,
-        "port": parsed.port or 5432,
-        "database": parsed.path[1:],
-        "user": parsed.username,
-        "password": parsed.password,
-        "sslmode": "require",
-    }
-else:
-    db_host = os.environ.get("DB_HOST", "localhost")
-    DB_CONFIG = {
-        "host": db_host,
-        "port": int(os.environ.get("DB_PORT", 5432)),
-        "database": os.environ.get("DB_NAME", "pricehawk"),
-        "user": os.environ.get("DB_USER", "pricehawk"),
-        "password": os.environ.get("DB_PASSWORD", "pricehawk_secret"),
-    }
-    if db_host != "localhost":
-        DB_CONFIG["sslmode"] = "require"
-
-# Mapping from filename part to retailer_id
-COMPETITOR_MAPPING = {
-    "homepro": "hp",
-    "megahome": "mgh",
-    "dohome": "dh",
-    "boonthavorn": "btv",
-    "globalhouse": "gbh",
-}
+# Matches any competitor key in a filename, case-insensitively
+_COMP_RE = re.compile("|".join(map(re.escape, COMPETITOR_MAPPING)), re.I)
 
 # Thai Watsadu retailer_id
 TWD_RETAILER_ID = "twd"
 
+# Number of match rows upserted per statement
+BATCH_SIZE = 1000
+
+# Rows per DataFrame chunk when streaming a spreadsheet (--stream)
+STREAM_CHUNK_ROWS = 50_000
+
+# Row upsert for the psycopg (v3) path, sent as a pipelined executemany
+UPSERT_MATCHES_SQL = """
+    INSERT INTO product_matches
+        (base_product_id, candidate_product_id, retailer_id, is_same, confidence_score,
+         reason, match_type, verified_by_user, verified_result)
+    VALUES (%s, %s, %s, %s, %s, %s, 'import', %s, %s)
+    ON CONFLICT (base_product_id, candidate_product_id)
+    DO UPDATE SET
+        is_same = EXCLUDED.is_same,
+        confidence_score = EXCLUDED.confidence_score,
+        verified_by_user = EXCLUDED.verified_by_user,
+        verified_result = EXCLUDED.verified_result,
+        updated_at = NOW()
+"""
+
+# Match rows are COPY'd into a per-transaction staging table, then merged with one upsert
+CREATE_MATCH_STAGE_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS match_stage (
+        base_product_id INTEGER,
+        candidate_product_id INTEGER,
+        retailer_id VARCHAR(10),
+        is_same BOOLEAN,
+        confidence_score NUMERIC(5,4),
+        reason TEXT,
+        verified_by_user BOOLEAN,
+        verified_result BOOLEAN
+    ) ON COMMIT DROP
+"""
+
+# The staging table lives until the file's transaction commits; clear it per batch
+CLEAR_MATCH_STAGE_SQL = "TRUNCATE match_stage"
+
+COPY_MATCH_STAGE_SQL = "COPY match_stage FROM STDIN WITH (FORMAT csv)"
+
+MERGE_MATCH_STAGE_SQL = """
+    INSERT INTO product_matches
+        (base_product_id, candidate_product_id, retailer_id, is_same, confidence_score,
+         reason, match_type, verified_by_user, verified_result)
+    SELECT base_product_id, candidate_product_id, retailer_id, is_same, confidence_score,
+           reason, 'import', verified_by_user, verified_result
+    FROM match_stage
+    ON CONFLICT (base_product_id, candidate_product_id)
+    DO UPDATE SET
+        is_same = EXCLUDED.is_same,
+        confidence_score = EXCLUDED.confidence_score,
+        verified_by_user = EXCLUDED.verified_by_user,
+        verified_result = EXCLUDED.verified_result,
+        updated_at = NOW()
+"""
+
+
+# Per-row upsert used by insert_match, prepared once per connection (see _ensure_prepared)
+PREPARE_MATCH_UPSERT_SQL = """
+    PREPARE match_upsert (INTEGER, INTEGER, VARCHAR, BOOLEAN, NUMERIC, TEXT, BOOLEAN, BOOLEAN) AS
+    INSERT INTO product_matches
+        (base_product_id, candidate_product_id, retailer_id, is_same, confidence_score,
+         reason, match_type, verified_by_user, verified_result)
+    VALUES ($1, $2, $3, $4, $5, $6, 'import', $7, $8)
+    ON CONFLICT (base_product_id, candidate_product_id)
+    DO UPDATE SET
+        is_same = EXCLUDED.is_same,
+        confidence_score = EXCLUDED.confidence_score,
+        verified_by_user = EXCLUDED.verified_by_user,
+        verified_result = EXCLUDED.verified_result,
+        updated_at = NOW()
+"""
+
+# Indexes the lookups and ON CONFLICT rely on. Names match the constraints in
+# database/init/01_schema.sql, so these are no-ops on a database built from it.
+ENSURE_INDEXES_SQL = [
+    "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS products_retailer_sku_unique "
+    "ON products (retailer_id, sku)",
+    "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS unique_match_pair "
+    "ON product_matches (base_product_id, candidate_product_id)",
+]
+
+# Connections that already have match_upsert prepared (prepared statements are per session)
+_prepared_conns = weakref.WeakSet()
+
 
 def get_db():
-    """Create database connection"""
-    return psycopg2.connect(**DB_CONFIG, cursor_factory=RealDictCursor)
+    """Create database connection (plain tuple cursors: no per-row dict on the hot path)"""
+    return psycopg2.connect(**DB_CONFIG)
+
+
+def open_psycopg3_pool(max_size: int) -> "ConnectionPool":
+    """Open a psycopg (v3) pool on DB_CONFIG; connections autocommit outside explicit transactions"""
+    kwargs = dict(DB_CONFIG)
+    kwargs["dbname"] = kwargs.pop("database")
+    return ConnectionPool(kwargs={**kwargs, "autocommit": True},
+                          min_size=1, max_size=max_size, open=True)
+
+
+def ensure_indexes(conn):
+    """Create the (retailer_id, sku) and match-pair unique indexes if they are missing."""
+    autocommit = conn.autocommit
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            for sql in ENSURE_INDEXES_SQL:
+                try:
+                    cur.execute(sql)
+                except Exception as e:
+                    print(f"  ! Could not create index: {e}")
+    finally:
+        conn.autocommit = autocommit
+
+
+def load_retailer_ids(conn) -> set[str]:
+    """All retailer_ids in the retailers table"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT retailer_id FROM retailers")
+        return {row[0] for row in cur.fetchall()}
 
 
 def parse_competitor_from_filename(filename: str) -> str | None:
     """Extract competitor retailer_id from filename like 'twd_homepro_correct_matches_v18.17.xlsx'"""
-    filename_lower = filename.lower()
-    for key, retailer_id in COMPETITOR_MAPPING.items():
-        if key in filename_lower:
-            return retailer_id
-    return None
+    m = _COMP_RE.search(filename)
+    return COMPETITOR_MAPPING[m.group(0).lower()] if m else None
 
 
 def get_product_id(conn, retailer_id: str, sku: str) -> int | None:
-    """Look up product_id by retailer and SKU"""
+    """Look up product_id by retailer and an already-stripped SKU string"""
     with conn.cursor() as cur:
         cur.execute(
             "SELECT product_id FROM products WHERE retailer_id = %s AND sku = %s",
-            (retailer_id, str(sku).strip())
+            (retailer_id, sku)
         )
         result = cur.fetchone()
-        return result["product_id"] if result else None
+        return result[0] if result else None
+
+
+def get_product_ids(conn, retailer_id: str, skus: list[str]) -> dict[str, int]:
+    """Look up product_ids for many SKUs of one retailer in a single query"""
+    if not skus:
+        return {}
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT sku, product_id FROM products WHERE retailer_id = %s AND sku = ANY(%s)",
+            (retailer_id, skus)
+        )
+        return dict(cur.fetchall())
+
+
+def load_product_index(conn, retailer_ids: list[str]) -> dict[str, dict[str, int]]:
+    """Fetch sku -> product_id for the given retailers in one query, keyed by retailer_id"""
+    index = {retailer_id: {} for retailer_id in retailer_ids}
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT retailer_id, sku, product_id FROM products WHERE retailer_id = ANY(%s)",
+            (list(retailer_ids),)
+        )
+        for retailer_id, sku, product_id in cur.fetchall():
+            index[retailer_id][sku] = product_id
+    return index
+
+
+def _distinct_skus(column: "pd.Series") -> list[str]:
+    """Distinct SKU strings of a normalized (see process_excel_file) DataFrame column"""
+    return column.dropna().unique().tolist()
+
+
+def _ensure_prepared(cur):
+    """PREPARE match_upsert on the cursor's connection if it hasn't been already."""
+    if cur.connection not in _prepared_conns:
+        cur.execute(PREPARE_MATCH_UPSERT_SQL)
+        _prepared_conns.add(cur.connection)
+
+
+def _report(report: list[str] | None, line: str):
+    """Add a line to a file's report (see process_one), or print it if there is none"""
+    if report is None:
+        print(line)
+    else:
+        report.append(line)
 
 
 def insert_match(conn, base_product_id: int, candidate_product_id: int, retailer_id: str,
                  is_same: bool = True, confidence: float = 1.0, reason: str = "excel_import",
-                 is_verified: bool = True) -> bool:
+                 is_verified: bool = True,
+                 report: list[str] | None = None) -> bool:
     """
     Insert a product match into the database.
 
+    Does not commit: the caller owns the transaction. A failing row is rolled back
+    to a savepoint so it doesn't abort the rest of the transaction.
+
     Args:
         is_verified: If True, mark as verified correct match.
                      If False, mark as unverified (needs review in UI).
     """
-    try:
-        with conn.cursor() as cur:
+    with conn.cursor() as cur:
+        _ensure_prepared(cur)
+        cur.execute("SAVEPOINT match_row")
+        try:
             cur.execute(
-                """
-                INSERT INTO product_matches
-                    (base_product_id, candidate_product_id, retailer_id, is_same, confidence_score,
-                     reason, match_type, verified_by_user, verified_result)
-                VALUES (%s, %s, %s, %s, %s, %s, 'import', %s, %s)
-                ON CONFLICT (base_product_id, candidate_product_id)
-                DO UPDATE SET
-                    is_same = EXCLUDED.is_same,
-                    confidence_score = EXCLUDED.confidence_score,
-                    verified_by_user = EXCLUDED.verified_by_user,
-                    verified_result = EXCLUDED.verified_result,
-                    updated_at = NOW()
-                """,
+                "EXECUTE match_upsert (%s, %s, %s, %s, %s, %s, %s, %s)",
                 (base_product_id, candidate_product_id, retailer_id, is_same, confidence, reason,
                  is_verified, is_same if is_verified else None)
             )
-            conn.commit()
-            return True
+        except Exception as e:
+            _report(report, f"    ! Error inserting match: {e}")
+            cur.execute("ROLLBACK TO SAVEPOINT match_row")
+            return False
+        cur.execute("RELEASE SAVEPOINT match_row")
+        return True
+
+
+def match_row(base_product_id: int, candidate_product_id: int, retailer_id: str,
+              is_same: bool = True, confidence: float = 1.0, reason: str = "excel_import",
+              is_verified: bool = True) -> tuple:
+    """Build the upsert row for a match (same defaults as insert_match)"""
+    return (base_product_id, candidate_product_id, retailer_id, is_same, confidence, reason,
+            is_verified, is_same if is_verified else None)
+
+
+def flush_batch(conn, rows: list[tuple], report: list[str] | None = None) -> bool:
+    """
+    Upsert a batch of match rows (see match_row) via COPY into a staging table
+    followed by a single INSERT ... SELECT ... ON CONFLICT.
+
+    Does not commit: the caller owns the transaction. A failing batch is rolled
+    back to a savepoint so earlier batches in the same transaction survive.
+
+    Rows repeating a (base, candidate) pair are collapsed to the last one, since a
+    single INSERT ... ON CONFLICT cannot update the same row twice.
+    """
+    if not rows:
+        return True
+    unique_rows = list({(row[0], row[1]): row for row in rows}.values())
+
+    # CSV text: None becomes an unquoted empty field, which COPY reads as NULL
+    buf = io.StringIO()
+    csv.writer(buf).writerows(unique_rows)
+    buf.seek(0)
+
+    with conn.cursor() as cur:
+        cur.execute("SAVEPOINT match_batch")
+        try:
+            cur.execute(CREATE_MATCH_STAGE_SQL)
+            cur.execute(CLEAR_MATCH_STAGE_SQL)
+            cur.copy_expert(COPY_MATCH_STAGE_SQL, buf)
+            cur.execute(MERGE_MATCH_STAGE_SQL)
+        except Exception as e:
+            _report(report, f"    ! Error inserting batch: {e}")
+            cur.execute("ROLLBACK TO SAVEPOINT match_batch")
+            return False
+        cur.execute("RELEASE SAVEPOINT match_batch")
+        return True
+
+
+def flush_batch_pipeline(conn, rows: list[tuple], report: list[str] | None = None) -> bool:
+    """
+    psycopg (v3) counterpart of flush_batch: upsert the rows with executemany in
+    pipeline mode, so all statements go out without waiting on each round-trip.
+
+    Runs in a nested transaction (a savepoint inside the file's transaction); a
+    failing batch is rolled back to it and reported as False.
+    """
+    if not rows:
+        return True
+    unique_rows = list({(row[0], row[1]): row for row in rows}.values())
+    try:
+        with conn.pipeline(), conn.transaction(), conn.cursor() as cur:
+            cur.executemany(UPSERT_MATCHES_SQL, unique_rows)
+        return True
     except Exception as e:
-        print(f"    ! Error inserting match: {e}")
-        conn.rollback()
+        _report(report, f"    ! Error inserting batch: {e}")
         return False
 
 
+def read_match_columns(file_path: Path) -> list[str]:
+    """Column names of a match spreadsheet, read from the header only"""
+    parquet_path = parquet_sibling(file_path)
+    if parquet_path:
+        import pyarrow.parquet as pq
+        return pq.read_schema(parquet_path).names
+    return list(pd.read_excel(file_path, nrows=0, engine="calamine").columns)
+
+
+def plan_uploads(excel_files: list[Path], known_retailers: set[str]) -> list[Path]:
+    """
+    Drop files whose competitor can't be resolved to a retailer in the database,
+    before any of them is parsed, and print the remaining planned work.
+    """
+    if TWD_RETAILER_ID not in known_retailers:
+        print(f"Error: base retailer '{TWD_RETAILER_ID}' not found in retailers table")
+        return []
+
+    planned = []
+    for file_path in sorted(excel_files):
+        competitor_id = parse_competitor_from_filename(file_path.name)
+        if not competitor_id:
+            print(f"  Skipping {file_path.name}: could not determine competitor from filename")
+        elif competitor_id not in known_retailers:
+            print(f"  Skipping {file_path.name}: retailer '{competitor_id}' not found in database")
+        else:
+            planned.append((file_path, competitor_id))
+
+    print(f"Planned uploads ({len(planned)} files):")
+    for file_path, competitor_id in planned:
+        print(f"  {file_path.name} -> {competitor_id}")
+    return [file_path for file_path, _ in planned]
+
+
+def iter_excel_rows(file_path: Path, columns: list[str]):
+    """
+    Yield {column: value} for `columns` of each data row on the first sheet.
+
+    Uses openpyxl's read-only mode, which streams the sheet XML instead of loading
+    the workbook, so memory stays flat however many rows the file has.
+    """
+    import openpyxl
+
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        positions = [(col, header.index(col)) for col in columns]
+        for values in rows:
+            yield {col: values[i] if i < len(values) else None for col, i in positions}
+    finally:
+        wb.close()
+
+
+def iter_match_chunks(file_path: Path, columns: list[str], text_columns: tuple[str, ...] = (),
+                      chunk_rows: int = STREAM_CHUNK_ROWS):
+    """
+    Read a match spreadsheet as DataFrames of at most `chunk_rows` rows.
+
+    Streaming counterpart of read_match_file: the .parquet sibling is read in record
+    batches, otherwise the .xlsx is streamed with iter_excel_rows.
+    """
+    parquet_path = parquet_sibling(file_path)
+    if parquet_path:
+        import pyarrow.parquet as pq
+        for record_batch in pq.ParquetFile(parquet_path).iter_batches(batch_size=chunk_rows,
+                                                                      columns=columns):
+            yield record_batch.to_pandas().astype({col: "string" for col in text_columns})
+        return
+
+    rows = iter_excel_rows(file_path, columns)
+    while chunk := list(islice(rows, chunk_rows)):
+        df = pd.DataFrame(chunk, columns=columns)
+        # Numeric SKU cells come back as ints; stringify them like read_excel(dtype=str)
+        for col in text_columns:
+            df[col] = df[col].map(lambda v: None if v is None else str(v)).astype("string")
+        yield df
+
+
+def convert_to_parquet(excel_files: list[Path], text_columns: tuple[str, ...] = ()):
+    """
+    Write a .parquet sibling for each Excel file so later runs skip xlsx parsing.
+    SKU columns and `text_columns` are stored as strings (see read_match_sheet).
+    """
+    for file_path in sorted(excel_files):
+        parquet_path = write_match_cache(file_path, read_match_sheet(file_path, text_columns))
+        print(f"  {file_path.name} -> {parquet_path.name}")
+
+
 def preview_excel_structure(file_path: Path):
     """Print the structure of an Excel file to help identify columns"""
     print(f"\n=== Preview of {file_path.name} ===")
-    df = pd.read_excel(file_path, nrows=5)
+    df = pd.read_excel(file_path, nrows=5, engine="calamine")
     print(f"Columns: {list(df.columns)}")
     print(f"First 5 rows:")
-    for idx, row in df.iterrows():
-        row_str = " | ".join([f"{col}: {str(val)[:30]}" for col, val in row.items()])
-        try:
-            print(f"  Row {idx}: {row_str}")
-        except UnicodeEncodeError:
-            print(f"  Row {idx}: [contains non-ASCII characters]")
+    # Thai product names may not be printable on every console: replace non-ASCII with '?'
+    preview = df.to_string(max_colwidth=30, max_cols=20)
+    print(preview.encode("ascii", errors="replace").decode())
     print("=" * 50)
 
 
+def _upsert_rows(conn, rows: list[tuple], use_psycopg3: bool = False,
+                 report: list[str] | None = None) -> tuple[int, int, int]:
+    """
+    Upsert match rows (see match_row) in BATCH_SIZE chunks within the caller's transaction.
+    A rejected chunk is retried row by row so only the offending rows fail.
+    Returns (successful, verified, failed)
+    """
+    upsert = flush_batch_pipeline if use_psycopg3 else flush_batch
+    successful = 0
+    verified = 0
+    failed = 0
+    for start in range(0, len(rows), BATCH_SIZE):
+        chunk = rows[start:start + BATCH_SIZE]
+        if upsert(conn, chunk, report):
+            successful += len(chunk)
+            verified += sum(1 for row in chunk if row[6])
+            continue
+
+        for row in chunk:
+            if upsert(conn, [row], report) if use_psycopg3 else insert_match(conn, *row[:7], report=report):
+                successful += 1
+                verified += bool(row[6])
+            else:
+                failed += 1
+    return (successful, verified, failed)
+
+
 def process_excel_file(conn, file_path: Path, twd_sku_col: str, comp_sku_col: str,
-                       dry_run: bool = False, correct_only: bool = False) -> tuple[int, int, int]:
+                       dry_run: bool = False, correct_only: bool = False,
+                       product_index: dict[str, dict[str, int]] | None = None,
+                       use_psycopg3: bool = False, stream: bool = False,
+                       report: list[str] | None = None) -> tuple[int, int, int]:
     """
     Process an Excel file and upload matches.
+    product_index (see load_product_index) is shared across files; without it the
+    file's SKUs are looked up with one query per retailer (per chunk when streaming).
+    With stream, the file is read and uploaded STREAM_CHUNK_ROWS rows at a time.
+    Output lines go to report when given (see process_one), otherwise are printed.
     Returns (total_rows, successful_matches, failed_matches)
     """
     filename = file_path.name
     competitor_id = parse_competitor_from_filename(filename)
 
     if not competitor_id:
-        print(f"Could not determine competitor from filename: {filename}")
+        _report(report, f"Could not determine competitor from filename: {filename}")
         return (0, 0, 0)
 
-    print(f"\nProcessing: {filename}")
-    print(f"  Competitor retailer_id: {competitor_id}")
+    _report(report, f"\nProcessing: {filename}")
+    _report(report, f"  Competitor retailer_id: {competitor_id}")
 
-    # Read Excel file
-    df = pd.read_excel(file_path)
-    total_rows = len(df)
-    print(f"  Total rows: {total_rows}")
+    # Check if required columns exist (header only), then read just those columns
+    available = read_match_columns(file_path)
+    for col in (twd_sku_col, comp_sku_col):
+        if col not in available:
+            _report(report, f"  Error: Column '{col}' not found. Available: {available}")
+            return (0, 0, 0)
 
-    # Filter for correct matches only if requested
-    if correct_only and "IS_CORRECT" in df.columns:
-        df = df[df["IS_CORRECT"] == True]
-        print(f"  Filtered to IS_CORRECT=True: {len(df)} rows")
-
-    # Check if required columns exist
-    if twd_sku_col not in df.columns:
-        print(f"  Error: Column '{twd_sku_col}' not found. Available: {list(df.columns)}")
-        return (total_rows, 0, 0)
+    # Check if IS_CORRECT column exists
+    has_is_correct = "IS_CORRECT" in available
 
-    if comp_sku_col not in df.columns:
-        print(f"  Error: Column '{comp_sku_col}' not found. Available: {list(df.columns)}")
-        return (total_rows, 0, 0)
+    needed = [twd_sku_col, comp_sku_col] + (["IS_CORRECT"] if has_is_correct else [])
+    text_columns = (twd_sku_col, comp_sku_col)
+    if stream:
+        chunks = iter_match_chunks(file_path, needed, text_columns)
+    else:
+        chunks = [read_match_file(file_path, columns=needed, text_columns=text_columns)]
 
+    total_rows = 0
+    filtered_rows = 0
     successful = 0
     failed = 0
-    not_found_twd = 0
-    not_found_comp = 0
     verified_count = 0
-    unverified_count = 0
-
-    # Check if IS_CORRECT column exists
-    has_is_correct = "IS_CORRECT" in df.columns
-
-    for idx, row in df.iterrows():
-        twd_sku = row[twd_sku_col]
-        comp_sku = row[comp_sku_col]
+    missing_twd = Counter()
+    missing_comp = Counter()
+
+    # One transaction per file (none for a dry run): commits once on success and rolls
+    # back on an unexpected error. With psycopg (v3) `with conn` would close the
+    # connection, so an explicit transaction block is used instead.
+    if dry_run:
+        transaction = nullcontext()
+    elif use_psycopg3:
+        transaction = conn.transaction()
+    else:
+        transaction = conn
 
-        # Skip empty rows
-        if pd.isna(twd_sku) or pd.isna(comp_sku):
-            continue
+    with transaction:
+        for df in chunks:
+            total_rows += len(df)
 
-        # Get IS_CORRECT value (default to True if column doesn't exist)
-        is_correct = True
-        if has_is_correct:
-            is_correct = bool(row["IS_CORRECT"]) if not pd.isna(row["IS_CORRECT"]) else False
+            # Normalize SKUs once: every lookup below uses these stripped strings as keys
+            for col in text_columns:
+                df[col] = df[col].astype("string").str.strip()
 
-        # Look up product IDs
-        twd_product_id = get_product_id(conn, TWD_RETAILER_ID, twd_sku)
-        comp_product_id = get_product_id(conn, competitor_id, comp_sku)
+            # Filter for correct matches only if requested (NA IS_CORRECT counts as False)
+            if correct_only and has_is_correct:
+                df = df.loc[df["IS_CORRECT"].fillna(False).astype(bool)]
+                filtered_rows += len(df)
 
-        if not twd_product_id:
-            not_found_twd += 1
-            if not_found_twd <= 3:
-                print(f"    ! TWD product not found: {twd_sku}")
-            continue
-
-        if not comp_product_id:
-            not_found_comp += 1
-            if not_found_comp <= 3:
-                print(f"    ! Competitor product not found: {comp_sku}")
-            continue
-
-        if dry_run:
-            status = "verified" if is_correct else "needs review"
-            print(f"    [DRY RUN] Would match TWD:{twd_sku} -> {competitor_id}:{comp_sku} ({status})")
-            successful += 1
-            if is_correct:
-                verified_count += 1
+            # Resolve all SKUs in the chunk up front instead of two queries per row
+            if product_index is not None:
+                twd_map = product_index.get(TWD_RETAILER_ID, {})
+                comp_map = product_index.get(competitor_id, {})
             else:
-                unverified_count += 1
-        else:
-            if insert_match(conn, twd_product_id, comp_product_id, competitor_id, is_verified=is_correct):
-                successful += 1
-                if is_correct:
-                    verified_count += 1
-                else:
-                    unverified_count += 1
+                twd_map = get_product_ids(conn, TWD_RETAILER_ID, _distinct_skus(df[twd_sku_col]))
+                comp_map = get_product_ids(conn, competitor_id, _distinct_skus(df[comp_sku_col]))
+
+            # Vectorized row handling: drop empty rows, map SKUs to product_ids column-wise
+            df = df.loc[df[twd_sku_col].notna() & df[comp_sku_col].notna()]
+            twd_skus = df[twd_sku_col]
+            comp_skus = df[comp_sku_col]
+            twd_pids = twd_skus.map(twd_map)
+            comp_pids = comp_skus.map(comp_map)
+
+            # Per-row flags as plain NumPy bool arrays, computed once per chunk.
+            # IS_CORRECT: NA counts as False; True for every row if the column doesn't exist.
+            if has_is_correct:
+                is_correct = df["IS_CORRECT"].fillna(False).astype(bool).to_numpy()
             else:
-                failed += 1
-
-    print(f"  Results: {successful} successful ({verified_count} verified, {unverified_count} needs review), {failed} failed")
+                is_correct = np.ones(len(df), dtype=bool)
+
+            twd_found = twd_pids.notna().to_numpy()
+            comp_found = comp_pids.notna().to_numpy()
+            comp_missing = twd_found & ~comp_found
+            matched = twd_found & comp_found
+
+            # Missing SKUs are tallied here and summarized once after the file's results
+            missing_twd.update(twd_skus[~twd_found])
+            missing_comp.update(comp_skus[comp_missing])
+
+            # .tolist() yields plain Python ints/bools that psycopg2 can adapt
+            base_ids = twd_pids[matched].astype(int).tolist()
+            candidate_ids = comp_pids[matched].astype(int).tolist()
+            verified_flags = is_correct[matched].tolist()
+
+            if dry_run:
+                for twd_sku, comp_sku, verified in zip(twd_skus[matched], comp_skus[matched], verified_flags):
+                    status = "verified" if verified else "needs review"
+                    _report(report, f"    [DRY RUN] Would match TWD:{twd_sku} -> {competitor_id}:{comp_sku} ({status})")
+                successful += len(verified_flags)
+                verified_count += sum(verified_flags)
+                continue
+
+            # Same rows as match_row(base, candidate, competitor_id, is_verified=verified), built
+            # by zip/repeat in C instead of a Python call per row. With is_same=True,
+            # verified_result is True for verified rows and NULL otherwise.
+            rows = list(zip(base_ids, candidate_ids, repeat(competitor_id), repeat(True),
+                            repeat(1.0), repeat("excel_import"), verified_flags,
+                            [verified or None for verified in verified_flags]))
+            chunk_successful, chunk_verified, chunk_failed = _upsert_rows(conn, rows, use_psycopg3, report)
+            successful += chunk_successful
+            verified_count += chunk_verified
+            failed += chunk_failed
+
+    unverified_count = successful - verified_count
+    not_found_twd = missing_twd.total()
+    not_found_comp = missing_comp.total()
+
+    _report(report, f"  Total rows: {total_rows}")
+    if correct_only and has_is_correct:
+        _report(report, f"  Filtered to IS_CORRECT=True: {filtered_rows} rows")
+    _report(report, f"  Results: {successful} successful ({verified_count} verified, {unverified_count} needs review), {failed} failed")
     if not_found_twd > 0:
-        print(f"  Warnings: {not_found_twd} TWD products not found in database")
+        _report(report, f"  Warnings: {not_found_twd} TWD products not found in database")
+        for sku, count in missing_twd.most_common(5):
+            _report(report, f"    ! TWD {sku}: {count} rows")
     if not_found_comp > 0:
-        print(f"  Warnings: {not_found_comp} competitor products not found in database")
+        _report(report, f"  Warnings: {not_found_comp} competitor products not found in database")
+        for sku, count in missing_comp.most_common(5):
+            _report(report, f"    ! {competitor_id} {sku}: {count} rows")
 
     return (total_rows, successful, failed)
 
 
-def main():
+def process_one(pool, excel_file: Path, args,
+                product_index: dict[str, dict[str, int]]) -> tuple[list[str], tuple[int, int, int]]:
+    """
+    Process one Excel file on a connection borrowed from the pool.
+    Runs in main's worker threads, so the file's output is collected and
+    returned for main to print in file order.
+    Returns (report_lines, process_excel_file result)
+    """
+    report = []
+    conn = pool.getconn()
+    try:
+        result = process_excel_file(
+            conn,
+            excel_file,
+            args.twd_col,
+            args.comp_col,
+            dry_run=args.dry_run,
+            correct_only=args.correct_only,
+            product_index=product_index,
+            use_psycopg3=args.use_psycopg3,
+            stream=args.stream,
+            report=report,
+        )
+        return report, result
+    finally:
+        pool.putconn(conn)
+
+
+def main(data_dir: Path | None = None):
+    """Upload the twd_*.xlsx files in `data_dir` (default: the seeder folder)"""
     import argparse
 
     parser = argparse.ArgumentParser(description="Upload product matches from Excel files")
@@ -252,17 +638,28 @@ def main():
                         help="Only import rows where IS_CORRECT is True. By default, all rows are imported: "
                              "IS_CORRECT=True as verified, IS_CORRECT=False as needs review")
     parser.add_argument("--file", help="Process only a specific file (optional)")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="Number of files processed concurrently (default: 8)")
+    parser.add_argument("--convert-parquet", action="store_true",
+                        help="Write a .parquet copy next to each Excel file; later runs read it instead")
+    parser.add_argument("--stream", action="store_true",
+                        help=f"Read and upload each file {STREAM_CHUNK_ROWS} rows at a time "
+                             "(bounded memory for very large spreadsheets)")
+    parser.add_argument("--use-psycopg3", action="store_true",
+                        help="Upload with psycopg (v3) pipelined upserts instead of psycopg2 COPY")
+    parser.add_argument("--ensure-indexes", action="store_true",
+                        help="Create the product/match indexes used by the upload if they are missing")
 
     args = parser.parse_args()
 
     print(f"DB: {DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}")
 
     # Find Excel files
-    seeder_dir = Path(__file__).parent
+    data_dir = data_dir or Path(__file__).parent
     if args.file:
-        excel_files = [seeder_dir / args.file]
+        excel_files = [data_dir / args.file]
     else:
-        excel_files = list(seeder_dir.glob("twd_*.xlsx"))
+        excel_files = list(data_dir.glob("twd_*.xlsx"))
 
     if not excel_files:
         print("No Excel files found (looking for twd_*.xlsx)")
@@ -276,30 +673,54 @@ def main():
             preview_excel_structure(f)
         return
 
-    # Connect to database
+    if args.convert_parquet:
+        print("Converting to Parquet...")
+        convert_to_parquet(excel_files, (args.twd_col, args.comp_col))
+        return
+
+    # Files are independent and DB-bound: process them concurrently, one pooled connection each
+    workers = max(1, min(args.workers, len(excel_files)))
+    if args.use_psycopg3 and not PSYCOPG3_AVAILABLE:
+        print("Error: --use-psycopg3 requires psycopg. Install with: pip install \"psycopg[binary,pool]\"")
+        return
     try:
-        conn = get_db()
+        if args.use_psycopg3:
+            pool = open_psycopg3_pool(workers)
+        else:
+            pool = ThreadedConnectionPool(1, workers, **DB_CONFIG)
         print("Connected to database")
     except Exception as e:
         print(f"Database connection failed: {e}")
         return
 
-    total_successful = 0
-    total_failed = 0
-
-    for excel_file in sorted(excel_files):
-        rows, successful, failed = process_excel_file(
-            conn,
-            excel_file,
-            args.twd_col,
-            args.comp_col,
-            dry_run=args.dry_run,
-            correct_only=args.correct_only
-        )
-        total_successful += successful
-        total_failed += failed
+    try:
+        conn = pool.getconn()
+        try:
+            if args.ensure_indexes:
+                print("Ensuring indexes...")
+                ensure_indexes(conn)
+            # Fail fast on files whose retailer isn't in the database, before parsing any
+            excel_files = plan_uploads(excel_files, load_retailer_ids(conn))
+            # One scan of products for every retailer involved, reused by all files in this run
+            competitor_ids = {parse_competitor_from_filename(f.name) for f in excel_files}
+            product_index = load_product_index(conn, [TWD_RETAILER_ID, *sorted(competitor_ids)])
+        finally:
+            pool.putconn(conn)
+
+        results = []
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            for report, result in ex.map(lambda f: process_one(pool, f, args, product_index),
+                                         excel_files):
+                print("\n".join(report))
+                results.append(result)
+    finally:
+        if args.use_psycopg3:
+            pool.close()
+        else:
+            pool.closeall()
 
-    conn.close()
+    total_successful = sum(successful for _, successful, _ in results)
+    total_failed = sum(failed for _, _, failed in results)
 
     print(f"\n{'='*50}")
     if args.dry_run: